@@ -3,9 +3,21 @@ echo ======================================
 echo Building GujaratiPDFTool EXE (Direct Path)
 echo ======================================
 
-"C:\Users\ibrahim\AppData\Roaming\Python\Python313\Scripts\pyinstaller.exe" --onefile --noconsole src\GujaratiAllInOneGUI_v2.py --name GujaratiPDFTool
+rem --onedir: a --onefile exe unpacks PyMuPDF / numpy / pyarrow to %TEMP% on every start,
+rem which costs seconds on a cold laptop. The engine imports these lazily (importlib), so
+rem PyInstaller cannot see them and they are listed as hidden imports.
+set HIDDEN=--hidden-import pymupdf --hidden-import numpy --hidden-import PIL.Image --hidden-import pdf2image ^
+ --hidden-import rapidfuzz.fuzz --hidden-import rapidfuzz.process --hidden-import openpyxl ^
+ --hidden-import openpyxl.cell.cell --hidden-import pyarrow --hidden-import pyarrow.compute ^
+ --hidden-import pyarrow.parquet --hidden-import pandas --hidden-import watchdog.observers
+
+"C:\Users\ibrahim\AppData\Roaming\Python\Python313\Scripts\pyinstaller.exe" --onedir --noconsole src\GujaratiAllInOneGUI_v2.py --name GujaratiPDFTool %HIDDEN%
+"C:\Users\ibrahim\AppData\Roaming\Python\Python313\Scripts\pyinstaller.exe" --onedir --console src\gujarati_cli.py --name GujaratiPDFToolCLI %HIDDEN%
+
+rem measure: dist\GujaratiPDFTool\GujaratiPDFTool.exe --startup-time
+rem (appends to %USERPROFILE%\.gujarati_pdf_tool\startup_times.log)
 
 echo ======================================
-echo BUILD FINISHED! Check the /dist folder.
+echo BUILD FINISHED! Check the dist\GujaratiPDFTool and dist\GujaratiPDFToolCLI folders.
 echo ======================================
 pause
\ No newline at end of file
@@ -2,106 +2,116 @@
 GujaratiAllInOneGUI_v2.py
 All-in-one: Convert PDFs -> Searchable PDFs (Tesseract) + Search inside PDFs (PyMuPDF or OCR fallback)
 Features:
- - Tabs: Convert / Search / Settings
+ - Tabs: Convert / Search / Voter Records / Jobs / Settings
+ - Jobs run one at a time from a priority queue: searches preempt bulk conversions,
+   any job can be paused / resumed / cancelled between pages
  - Improved progress (file + page level) + status label
- - Results Table (Treeview) with Export CSV/XLSX
+ - Results Table (Treeview) with Export CSV/XLSX/Parquet (streamed in the background, constant memory)
+ - Watch folder: PDFs dropped into the input folder are converted and indexed as they arrive
+ - Voter records: card fields (name, age, ward, ...) parsed into a Parquet store and filtered
  - Dark mode toggle (simple)
  - One-click build batch file provided separately
+ - Convert / search engine lives in gujarati_engine.py (also used by gujarati_cli.py)
+ - Fast startup: PyMuPDF / numpy / openpyxl / pyarrow load in the background after the
+   window appears; `--startup-time` logs the startup timings to startup_times.log and exits
 Author: SM TECHIE (adapted)
 """
 
+import time
+STARTED = time.perf_counter()  # --startup-time measures from here
+
+import itertools
+import multiprocessing
 import os
-import subprocess
+import queue
+import sqlite3
+import sys
 import threading
-import unicodedata
-import tempfile
-import shutil
 from tkinter import *
 from tkinter import ttk, filedialog, messagebox
-import fitz  # PyMuPDF
-from pdf2image import convert_from_path
-import pytesseract
-from PIL import Image, ImageTk
-import pandas as pd
-from rapidfuzz import fuzz
-from PyPDF2 import PdfMerger
-
-# -----------------------------
-# DEFAULT CONFIG - edit if needed
-# -----------------------------
-DEFAULT_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-DEFAULT_POPPLER_PATH = r"C:\Program Files\poppler-25.07.0\Library\bin"
-DEFAULT_OCR_LANG = "guj+eng"
-DEFAULT_DPI = 250
-DEFAULT_FUZZY = 70
-DEFAULT_OUTPUT_DIRNAME = "_searchable"
-
-# -----------------------------
-# Helpers
-# -----------------------------
-def normalize_text(s):
-    if not s:
-        return ""
-    t = unicodedata.normalize("NFC", s)
-    t = t.replace("\u200c", "").replace("\u200d", "")
-    return t.strip()
-
-def fuzzy_score(a, b):
-    try:
-        return fuzz.partial_ratio(a.lower(), b.lower())
-    except Exception:
-        return 0
-
-def fuzzy_match(line, term, threshold):
-    ln = normalize_text(line)
-    tm = normalize_text(term)
-    if tm in ln:
-        return True
-    return fuzzy_score(tm, ln) >= threshold
-
-def run_tesseract_on_image(img_path, out_base, tesseract_cmd, lang):
-    cmd = f'"{tesseract_cmd}" "{img_path}" "{out_base}" -l {lang} pdf'
-    subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-def make_searchable_from_images(img_files, out_pdf_path, tesseract_cmd, lang):
-    temp_pdfs = []
-    for img in img_files:
-        base = img.rsplit(".", 1)[0] + "_ocr"
-        run_tesseract_on_image(img, base, tesseract_cmd, lang)
-        temp_pdfs.append(base + ".pdf")
-    merger = PdfMerger()
-    for p in temp_pdfs:
-        if os.path.exists(p):
-            merger.append(p)
-    merger.write(out_pdf_path)
-    merger.close()
+from gujarati_engine import (
+    DEFAULT_APP_DIR, DEFAULT_SETTINGS, DEFAULT_SETTINGS_PATH, DEFAULT_INDEX_PATH, DEFAULT_RECORDS_DIR, RECORD_COLUMNS, RESULT_COLUMNS,
+    PRIORITY_BACKGROUND, PRIORITY_IDLE, PRIORITY_NAMES, PRIORITY_NORMAL, PRIORITY_URGENT,
+    Engine, EngineError, FolderWatcher, JobScheduler, PageTextIndex, RecordStore, ResultStore, export_rows, load_settings,
+    parse_age_range, preload_modules, save_settings, shared_ocr_cache,
+)
+IMPORTED = time.perf_counter()
+
+RESULTS_PAGE_SIZE = 500      # rows materialized in the Treeview at a time
+RESULTS_POLL_MS = 100
+RECORDS_SHOWN = 1000         # matching voter records listed in the Records tab
+JOB_COLUMNS = ["#", "Job", "Priority", "State", "Progress"]
+STARTUP_LOG = os.path.join(DEFAULT_APP_DIR, "startup_times.log")
 
 # -----------------------------
 # GUI App
 # -----------------------------
 class GujaratiAllInOneGUI:
-    def __init__(self, root):
+    def __init__(self, root, measure_startup=False):
         self.root = root
         self.root.title("Gujarati PDF Converter & Search — SM TECHIE")
         self.root.geometry("1100x740")
 
-        # vars
+        # vars (initial values come from the saved settings shared with the CLI)
+        try:
+            settings = load_settings()
+        except EngineError as e:
+            messagebox.showwarning("Settings", f"{e}\nUsing the default settings.")
+            settings = dict(DEFAULT_SETTINGS)
         self.input_folder = StringVar()
         self.output_folder = StringVar()
-        self.tesseract_cmd = StringVar(value=DEFAULT_TESSERACT_CMD)
-        self.poppler_path = StringVar(value=DEFAULT_POPPLER_PATH)
-        self.ocr_lang = StringVar(value=DEFAULT_OCR_LANG)
-        self.dpi = IntVar(value=DEFAULT_DPI)
-        self.fuzzy = IntVar(value=DEFAULT_FUZZY)
+        self.tesseract_cmd = StringVar(value=settings["tesseract_cmd"])
+        self.poppler_path = StringVar(value=settings["poppler_path"])
+        self.ocr_lang = StringVar(value=settings["ocr_lang"])
+        self.dpi = IntVar(value=settings["dpi"])
+        self.fuzzy = IntVar(value=settings["fuzzy"])
         self.search_terms = StringVar()
-        self.create_subfolder = BooleanVar(value=True)
+        self.create_subfolder = BooleanVar(value=settings["create_subfolder"])
+        self.skip_up_to_date = BooleanVar(value=settings["skip_up_to_date"])
+        self.incremental = BooleanVar(value=settings["incremental"])
         self.dark_mode = BooleanVar(value=False)
-
-        # results list
-        self.results = []
+        self.ocr_workers = IntVar(value=settings["ocr_workers"])
+        self.search_workers = IntVar(value=settings["search_workers"])
+        self.ocr_batch_pages = IntVar(value=settings["ocr_batch_pages"])
+        self.min_dpi = IntVar(value=settings["min_dpi"])
+        self.ocr_image = StringVar(value=settings["ocr_image"])
+        self.deskew = BooleanVar(value=settings["deskew"])
+        self.crop_split = BooleanVar(value=settings["crop_split"])
+        self.phonetic = BooleanVar(value=settings["phonetic"])
+        self.use_index = BooleanVar(value=settings["use_index"])
+        self.index_path = StringVar(value=settings["index_path"])
+        self.ocr_cache_mb = IntVar(value=settings["ocr_cache_mb"])
+        self.trace_path = StringVar(value=settings["trace_path"])
+        self.records_dir = StringVar(value=settings["records_dir"])
+        self.watch_workers = IntVar(value=settings["watch_workers"])
+        self.watch_polling = BooleanVar(value=settings["watch_polling"])
+        self.rec_surname = StringVar()
+        self.rec_name = StringVar()
+        self.rec_age = StringVar()
+        self.rec_ward = StringVar()
+        self.rec_part = StringVar()
+        self.rec_gender = StringVar()
+        self.records_df = None
+
+        # results: the search thread appends matches straight to the (disk-spilling,
+        # thread-safe) store; the Tk loop only polls its size and shows one page at a time
+        self.results = ResultStore()
+        self.results_shown = 0  # store size the table / page label last reflected
+        self.search_generation = 0
+        self.search_job = None  # latest search, for Stop
+        self.page_start = 0
+
+        # jobs: one runs at a time, highest priority first; worker threads report
+        # state / progress changes on the queue, the Tk loop updates the Jobs tab
+        self.job_queue = queue.Queue()
+        self.scheduler = JobScheduler(on_change=self.job_queue.put)
 
         self._build_ui()
         self.apply_style()  # apply initial style
+        self.root.after(RESULTS_POLL_MS, self._poll_results)
+        self.root.after(RESULTS_POLL_MS, self._drain_jobs)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after_idle(self._after_first_paint, measure_startup)
 
     def _build_ui(self):
         # Notebook tabs
@@ -123,11 +133,14 @@ class GujaratiAllInOneGUI:
         Button(frm_cv_top, text="Browse", command=self.browse_output).grid(row=1, column=2, padx=6)
 
         Checkbutton(frm_cv_top, text="Create _searchable subfolder", variable=self.create_subfolder).grid(row=2, column=1, sticky=W, pady=4)
+        Checkbutton(frm_cv_top, text="Skip PDFs whose searchable output is newer than the source", variable=self.skip_up_to_date).grid(row=3, column=1, sticky=W)
+        Checkbutton(frm_cv_top, text="Incremental: only PDFs added or changed since the last run (interrupted runs always resume)", variable=self.incremental).grid(row=4, column=1, sticky=W)
 
         btn_frame = Frame(tab_convert)
         btn_frame.pack(fill=X, pady=6)
         Button(btn_frame, text="Convert Folder → Searchable PDFs", bg="#1976D2", fg="white", command=self.start_convert).pack(side=LEFT, padx=6)
         Button(btn_frame, text="Convert PDFs → Images (for debug)", command=self.start_convert_images_only).pack(side=LEFT, padx=6)
+        Button(btn_frame, text="Watch Input Folder (convert + index new PDFs)", command=self.start_watch).pack(side=LEFT, padx=6)
 
         # --- Tab: Search ---
         tab_search = Frame(nb)
@@ -142,6 +155,8 @@ class GujaratiAllInOneGUI:
         Label(frm_search_top, text="Search Terms (comma-separated):").grid(row=1, column=0, sticky=W)
         Entry(frm_search_top, textvariable=self.search_terms, width=60).grid(row=1, column=1, padx=6)
         Button(frm_search_top, text="Start Search", bg="#2E7D32", fg="white", command=self.start_search_thread).grid(row=1, column=2, padx=6)
+        Button(frm_search_top, text="Stop", command=self.stop_search).grid(row=1, column=3, padx=6)
+        Checkbutton(frm_search_top, text="Match spelling variants and Latin names (મેમણ / મેમન / Memon)", variable=self.phonetic).grid(row=2, column=1, sticky=W)
 
         # progress + status
         self.progress = ttk.Progressbar(tab_search, length=900, mode="determinate")
@@ -150,22 +165,88 @@ class GujaratiAllInOneGUI:
         self.status_label.pack(fill=X, padx=8)
 
         # results treeview
-        cols = ["PDF File", "Page", "Matched Term", "Matched Line", "Context (3 lines)", "Mode"]
+        cols = RESULT_COLUMNS
         self.tree = ttk.Treeview(tab_search, columns=cols, show="headings", height=18)
         for c in cols:
             self.tree.heading(c, text=c)
             width = 120 if c != "Context (3 lines)" else 400
             self.tree.column(c, width=width, anchor=W)
-        self.tree.pack(fill=BOTH, expand=True, padx=8, pady=8)
+        self.tree.pack(fill=BOTH, expand=True, padx=8, pady=(8,0))
+
+        frm_pages = Frame(tab_search)
+        frm_pages.pack(fill=X, padx=8)
+        Button(frm_pages, text="◀ Prev", command=lambda: self.show_results_page(self.page_start - RESULTS_PAGE_SIZE)).pack(side=LEFT)
+        Button(frm_pages, text="Next ▶", command=lambda: self.show_results_page(self.page_start + RESULTS_PAGE_SIZE)).pack(side=LEFT, padx=6)
+        self.page_label = Label(frm_pages, text="No results", anchor="w")
+        self.page_label.pack(side=LEFT, padx=6)
 
         # results buttons
         frm_results = Frame(tab_search)
         frm_results.pack(fill=X, pady=6)
         Button(frm_results, text="Export CSV", command=self.export_csv).pack(side=LEFT, padx=6)
         Button(frm_results, text="Export Excel", command=self.export_excel).pack(side=LEFT, padx=6)
+        Button(frm_results, text="Export Parquet", command=self.export_parquet).pack(side=LEFT, padx=6)
         Button(frm_results, text="Clear Results", command=self.clear_results).pack(side=LEFT, padx=6)
         Button(frm_results, text="Copy Selected Context", command=self.copy_selected_context).pack(side=LEFT, padx=6)
 
+        # --- Tab: Voter Records ---
+        tab_records = Frame(nb)
+        nb.add(tab_records, text="Voter Records")
+
+        frm_rec_top = Frame(tab_records, pady=6)
+        frm_rec_top.pack(fill=X)
+        Label(frm_rec_top, text="Roll Folder:").grid(row=0, column=0, sticky=W)
+        Entry(frm_rec_top, textvariable=self.input_folder, width=70).grid(row=0, column=1, columnspan=7, sticky=W, padx=6)
+        Button(frm_rec_top, text="Update Records", bg="#1976D2", fg="white", command=self.start_records_thread).grid(row=0, column=8, padx=6)
+
+        Label(frm_rec_top, text="Surname:").grid(row=1, column=0, sticky=W)
+        Entry(frm_rec_top, textvariable=self.rec_surname, width=18).grid(row=1, column=1, sticky=W, padx=6)
+        Label(frm_rec_top, text="Name contains:").grid(row=1, column=2, sticky=W)
+        Entry(frm_rec_top, textvariable=self.rec_name, width=18).grid(row=1, column=3, sticky=W, padx=6)
+        Label(frm_rec_top, text="Age (e.g. 30-40):").grid(row=1, column=4, sticky=W)
+        Entry(frm_rec_top, textvariable=self.rec_age, width=8).grid(row=1, column=5, sticky=W, padx=6)
+        Label(frm_rec_top, text="Ward:").grid(row=1, column=6, sticky=W)
+        Entry(frm_rec_top, textvariable=self.rec_ward, width=6).grid(row=1, column=7, sticky=W, padx=6)
+        Button(frm_rec_top, text="Query", bg="#2E7D32", fg="white", command=self.query_records).grid(row=1, column=8, padx=6)
+        Label(frm_rec_top, text="Gender:").grid(row=2, column=0, sticky=W)
+        ttk.Combobox(frm_rec_top, textvariable=self.rec_gender, values=["", "M", "F", "O"], state="readonly", width=4).grid(row=2, column=1, sticky=W, padx=6)
+        Label(frm_rec_top, text="Part:").grid(row=2, column=2, sticky=W)
+        Entry(frm_rec_top, textvariable=self.rec_part, width=6).grid(row=2, column=3, sticky=W, padx=6)
+        Checkbutton(frm_rec_top, text="Surname spelling variants / Latin (મેમણ / મેમન / Memon)", variable=self.phonetic).grid(row=2, column=4, columnspan=4, sticky=W)
+
+        self.rec_tree = ttk.Treeview(tab_records, columns=RECORD_COLUMNS, show="headings", height=18)
+        for c in RECORD_COLUMNS:
+            self.rec_tree.heading(c, text=c)
+            self.rec_tree.column(c, width=160 if c in ("path", "name", "relative_name") else 70, anchor=W)
+        self.rec_tree.pack(fill=BOTH, expand=True, padx=8, pady=(8,0))
+
+        frm_rec_bottom = Frame(tab_records)
+        frm_rec_bottom.pack(fill=X, pady=6)
+        Button(frm_rec_bottom, text="Export", command=self.export_records).pack(side=LEFT, padx=6)
+        self.rec_label = Label(frm_rec_bottom, text="No records", anchor="w")
+        self.rec_label.pack(side=LEFT, padx=6)
+
+        # --- Tab: Jobs ---
+        tab_jobs = Frame(nb)
+        nb.add(tab_jobs, text="Jobs")
+
+        self.job_tree = ttk.Treeview(tab_jobs, columns=JOB_COLUMNS, show="headings", height=18)
+        for c in JOB_COLUMNS:
+            self.job_tree.heading(c, text=c)
+            self.job_tree.column(c, width={"#": 40, "Job": 420, "Progress": 360}.get(c, 90), anchor=W)
+        self.job_tree.pack(fill=BOTH, expand=True, padx=8, pady=(8,0))
+
+        frm_jobs = Frame(tab_jobs)
+        frm_jobs.pack(fill=X, pady=6)
+        Button(frm_jobs, text="Pause", command=lambda: self.job_action(self.scheduler.pause)).pack(side=LEFT, padx=6)
+        Button(frm_jobs, text="Resume", command=lambda: self.job_action(self.scheduler.resume)).pack(side=LEFT, padx=6)
+        Button(frm_jobs, text="Cancel", command=lambda: self.job_action(self.scheduler.cancel)).pack(side=LEFT, padx=6)
+        Button(frm_jobs, text="Run First", command=lambda: self.job_action(
+            lambda job: self.scheduler.set_priority(job, PRIORITY_URGENT))).pack(side=LEFT, padx=6)
+        Button(frm_jobs, text="Clear Finished", command=self.clear_finished_jobs).pack(side=LEFT, padx=6)
+        Label(frm_jobs, text="Searches run before record updates, record updates before conversions, the folder watcher "
+                             "when nothing else is queued; a paused or preempted job continues from the page it stopped at.", anchor="w").pack(side=LEFT, padx=6)
+
         # --- Tab: Settings ---
         tab_settings = Frame(nb)
         nb.add(tab_settings, text="Settings")
@@ -189,12 +270,73 @@ class GujaratiAllInOneGUI:
         Label(frm_set, text="Fuzzy threshold (%):").grid(row=4, column=0, sticky=W)
         Entry(frm_set, textvariable=self.fuzzy, width=6).grid(row=4, column=1, sticky=W, padx=6)
 
-        Checkbutton(frm_set, text="Dark mode", variable=self.dark_mode, command=self.toggle_dark).grid(row=5, column=1, sticky=W, pady=8)
+        Label(frm_set, text="OCR workers (parallel pages):").grid(row=5, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.ocr_workers, width=6).grid(row=5, column=1, sticky=W, padx=6)
+
+        Label(frm_set, text="Search worker processes (1 = off):").grid(row=6, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.search_workers, width=6).grid(row=6, column=1, sticky=W, padx=6)
+
+        Label(frm_set, text="OCR pages per Tesseract call:").grid(row=7, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.ocr_batch_pages, width=6).grid(row=7, column=1, sticky=W, padx=6)
+
+        Label(frm_set, text="Adaptive DPI - lowest DPI (0 = off):").grid(row=8, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.min_dpi, width=6).grid(row=8, column=1, sticky=W, padx=6)
+
+        Label(frm_set, text="Image sent to Tesseract:").grid(row=9, column=0, sticky=W)
+        ttk.Combobox(frm_set, textvariable=self.ocr_image, values=["color", "gray", "binary"], state="readonly", width=10).grid(row=9, column=1, sticky=W, padx=6)
+        Checkbutton(frm_set, text="Deskew scanned pages", variable=self.deskew).grid(row=10, column=1, sticky=W)
+        Checkbutton(frm_set, text="Search OCR: crop margins and OCR each voter-card column separately", variable=self.crop_split).grid(row=11, column=1, sticky=W)
+
+        Label(frm_set, text="Search index (SQLite):").grid(row=12, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.index_path, width=70).grid(row=12, column=1, padx=6)
+        Button(frm_set, text="Clear Index", command=self.clear_index).grid(row=12, column=2, padx=6)
+        Checkbutton(frm_set, text="Use search index (re-read only new/changed files)", variable=self.use_index).grid(row=13, column=1, sticky=W)
+
+        Label(frm_set, text="Voter records folder (Parquet):").grid(row=14, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.records_dir, width=70).grid(row=14, column=1, padx=6)
+        Button(frm_set, text="Clear Records", command=self.clear_records).grid(row=14, column=2, padx=6)
+
+        Label(frm_set, text="OCR cache size (MB, 0 = off):").grid(row=15, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.ocr_cache_mb, width=6).grid(row=15, column=1, sticky=W, padx=6)
+        Button(frm_set, text="Clear OCR Cache", command=self.clear_ocr_cache).grid(row=15, column=2, padx=6)
+
+        Label(frm_set, text="Timing trace (Chrome JSON, blank = off):").grid(row=16, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.trace_path, width=70).grid(row=16, column=1, padx=6)
+        Button(frm_set, text="Browse", command=self.locate_trace).grid(row=16, column=2, padx=6)
+
+        Label(frm_set, text="Watch folder: files processed at once:").grid(row=17, column=0, sticky=W)
+        Entry(frm_set, textvariable=self.watch_workers, width=6).grid(row=17, column=1, sticky=W, padx=6)
+        Checkbutton(frm_set, text="Watch folder by polling (network shares that send no change events)", variable=self.watch_polling).grid(row=18, column=1, sticky=W)
+
+        Checkbutton(frm_set, text="Dark mode", variable=self.dark_mode, command=self.toggle_dark).grid(row=19, column=1, sticky=W, pady=8)
+        Button(frm_set, text="Save Settings", command=self.save_settings).grid(row=20, column=1, sticky=W, padx=6)
 
         # bottom log area
         self.log = Text(self.root, height=6, bg="#f4f4f4")
         self.log.pack(fill=X, padx=8, pady=(0,8))
 
+    # ----------------- Startup -----------------
+    def _after_first_paint(self, measure):
+        # the window is up: load the heavy engine dependencies now instead of on the first click
+        self.root.update_idletasks()
+        painted = time.perf_counter()
+        if not measure:
+            threading.Thread(target=preload_modules, daemon=True).start()
+            return
+        loaded = preload_modules()
+        done = time.perf_counter()
+        modules = ", ".join(f"{name} {secs:.2f}s" for name, secs, ok in loaded if ok)
+        line = (f"{time.strftime('%Y-%m-%d %H:%M:%S')} imports {IMPORTED - STARTED:.2f}s, "
+                f"first paint {painted - STARTED:.2f}s, dependencies {done - painted:.2f}s ({modules})")
+        self.log_print("Startup:", line)
+        try:
+            os.makedirs(DEFAULT_APP_DIR, exist_ok=True)
+            with open(STARTUP_LOG, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        except OSError as e:
+            self.log_print("Could not write", STARTUP_LOG, ":", e)
+        self.root.after(0, self.on_close)
+
     # Utility UI helpers
     def browse_input(self):
         d = filedialog.askdirectory()
@@ -216,39 +358,196 @@ class GujaratiAllInOneGUI:
         if d:
             self.poppler_path.set(d)
 
+    def locate_trace(self):
+        p = filedialog.asksaveasfilename(title="Timing trace file", defaultextension=".json",
+                                         filetypes=[("Chrome trace","*.json")], initialfile="gujarati_trace.json")
+        if p:
+            self.trace_path.set(p)
+
     def log_print(self, *args):
         s = " ".join(str(a) for a in args)
         self.log.insert(END, s + "\n")
         self.log.see(END)
         print(s)
 
+    def collect_settings(self):
+        """Current Settings tab values as an engine settings dict."""
+        settings = dict(DEFAULT_SETTINGS)
+        for name in settings:
+            try:
+                value = getattr(self, name).get()
+            except (TclError, ValueError):
+                continue  # half-typed number: keep the default
+            settings[name] = value.strip() if isinstance(value, str) else value
+        return settings
+
+    def save_settings(self):
+        try:
+            save_settings(self.collect_settings())
+            self.log_print("Settings saved to", DEFAULT_SETTINGS_PATH)
+        except OSError as e:
+            self.log_print("Could not save settings:", e)
+
+    def make_engine(self):
+        return Engine(self.collect_settings(), log=self.log_print, progress=self.set_progress)
+
+    def set_progress(self, done, total, text=None):
+        self.progress["maximum"] = max(total, 1)
+        self.progress["value"] = done
+        if text:
+            self.status_label.config(text=text)
+
+    def clear_index(self):
+        try:
+            with PageTextIndex(self.index_path.get().strip() or DEFAULT_INDEX_PATH) as index:
+                index.clear()
+            self.log_print("Search index cleared.")
+        except Exception as e:
+            self.log_print("Index error:", e)
+
+    def clear_records(self):
+        try:
+            RecordStore(self.records_dir.get().strip() or DEFAULT_RECORDS_DIR).clear()
+            self.log_print("Voter records cleared.")
+        except Exception as e:
+            self.log_print("Records error:", e)
+
+    def clear_ocr_cache(self):
+        cache = shared_ocr_cache(self.collect_settings())
+        if cache is not None:
+            cache.clear()
+            self.log_print("OCR cache cleared.")
+
     def clear_results(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        self.results = []
+        with self.results.lock:
+            self.search_generation += 1  # matches still arriving from an older search are dropped
+            self.results.clear()
+        self.results_shown = 0
+        self.tree.delete(*self.tree.get_children())
+        self.page_start = 0
+        self._update_page_label()
         self.progress["value"] = 0
         self.status_label.config(text="Ready")
         self.log_print("Results cleared.")
 
-    def export_csv(self):
-        if not self.results:
-            messagebox.showinfo("Info", "No results to export.")
+    def _add_result(self, generation, rec):
+        # search thread: the generation check and the append are atomic against clear_results
+        with self.results.lock:
+            if generation == self.search_generation:
+                self.results.append(rec)
+
+    def _poll_results(self):
+        # runs on the Tk main loop: fill the current page with rows that arrived since the last tick
+        total = len(self.results)
+        if total != self.results_shown:
+            self.results_shown = total
+            shown = len(self.tree.get_children())
+            if shown < RESULTS_PAGE_SIZE:
+                for rec in self.results.rows(self.page_start + shown, RESULTS_PAGE_SIZE - shown):
+                    self.tree.insert("", END, values=[rec[c] for c in RESULT_COLUMNS])
+            self._update_page_label()
+        self.root.after(RESULTS_POLL_MS, self._poll_results)
+
+    def show_results_page(self, start):
+        total = len(self.results)
+        start = max(0, min(start, (max(total, 1) - 1) // RESULTS_PAGE_SIZE * RESULTS_PAGE_SIZE))
+        self.page_start = start
+        self.tree.delete(*self.tree.get_children())
+        for rec in self.results.rows(start, RESULTS_PAGE_SIZE):
+            self.tree.insert("", END, values=[rec[c] for c in RESULT_COLUMNS])
+        self._update_page_label()
+
+    def _update_page_label(self):
+        total = len(self.results)
+        if not total:
+            self.page_label.config(text="No results")
             return
-        df = pd.DataFrame(self.results)
-        out = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")], initialfile="search_results.csv")
-        if out:
-            df.to_csv(out, index=False, encoding="utf-8-sig")
-            messagebox.showinfo("Saved", f"CSV saved: {out}")
+        end = min(self.page_start + RESULTS_PAGE_SIZE, total)
+        spilled = " (spilled to disk)" if self.results.spilled else ""
+        self.page_label.config(text=f"Rows {self.page_start + 1:,}–{end:,} of {total:,}{spilled}")
+
+    def export_csv(self):
+        self.export_results(".csv", "CSV")
 
     def export_excel(self):
+        self.export_results(".xlsx", "Excel")
+
+    def export_parquet(self):
+        self.export_results(".parquet", "Parquet")
+
+    def export_results(self, ext, kind):
         if not self.results:
             messagebox.showinfo("Info", "No results to export.")
             return
-        df = pd.DataFrame(self.results)
-        out = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel","*.xlsx")], initialfile="search_results.xlsx")
+        out = filedialog.asksaveasfilename(defaultextension=ext, filetypes=[(kind, "*" + ext)], initialfile="search_results" + ext)
         if out:
-            df.to_excel(out, index=False)
-            messagebox.showinfo("Saved", f"Excel saved: {out}")
+            # rows found so far; the store streams them from memory / its spill file in chunks
+            total = len(self.results)
+            self.start_export(self._export_result_rows(total), out, RESULT_COLUMNS, total)
+
+    def _export_result_rows(self, total):
+        # a clear / new search empties the store under the export: fail instead of writing a short file
+        generation = self.search_generation
+        for rec in itertools.islice(iter(self.results), total):
+            if generation != self.search_generation:
+                break
+            yield rec
+        if generation != self.search_generation:
+            raise EngineError("the results were cleared while exporting")
+
+    def start_export(self, rows, out, columns, total):
+        thr = threading.Thread(target=self._export_thread, args=(rows, out, columns, total), daemon=True)
+        thr.start()
+
+    def _export_thread(self, rows, out, columns, total):
+        try:
+            n = export_rows(rows, out, columns, total, progress=self.set_progress)
+        except (EngineError, OSError, sqlite3.Error) as e:
+            self.set_progress(0, 1, "Export failed")
+            messagebox.showerror("Error", f"Export failed: {e}")
+            return
+        self.log_print(f"Exported {n:,} rows to {out}")
+        messagebox.showinfo("Saved", f"Saved: {out}")
+
+    # ----------------- Jobs -----------------
+    def submit_job(self, name, target, priority):
+        return self.scheduler.submit(name, self.make_engine(), target, priority)
+
+    def _drain_jobs(self):
+        # runs on the Tk main loop: redraw the rows of jobs that changed since the last tick
+        changed = {}
+        try:
+            while True:
+                job = self.job_queue.get_nowait()
+                changed[job.id] = job
+        except queue.Empty:
+            pass
+        for job in changed.values():
+            done, total, text = job.progress
+            progress = (f"{done:,}/{total:,}  " if total else "") + text
+            if job.state == "failed":
+                progress = f"{job.error}"
+            values = [job.id, job.name, PRIORITY_NAMES.get(job.priority, job.priority), job.state, progress]
+            iid = str(job.id)
+            if self.job_tree.exists(iid):
+                self.job_tree.item(iid, values=values)
+            else:
+                self.job_tree.insert("", END, iid=iid, values=values)
+        self.root.after(RESULTS_POLL_MS, self._drain_jobs)
+
+    def job_action(self, action):
+        jobs = {str(job.id): job for job in self.scheduler.jobs}
+        sels = [jobs[iid] for iid in self.job_tree.selection() if iid in jobs]
+        if not sels:
+            messagebox.showinfo("Info", "No jobs selected.")
+            return
+        for job in sels:
+            action(job)
+
+    def clear_finished_jobs(self):
+        live = {str(job.id) for job in self.scheduler.active()}
+        self.scheduler.forget_finished()
+        self.job_tree.delete(*[iid for iid in self.job_tree.get_children() if iid not in live])
 
     def copy_selected_context(self):
         sels = self.tree.selection()
@@ -266,219 +565,144 @@ class GujaratiAllInOneGUI:
 
     # ----------------- Conversion Flow -----------------
     def start_convert(self):
-        thr = threading.Thread(target=self._convert_folder_thread, daemon=True)
-        thr.start()
+        inp, out = self.input_folder.get().strip(), self.output_folder.get().strip()
+        self.submit_job(f"Convert {inp}", lambda engine: self._convert_folder_job(engine, inp, out), PRIORITY_BACKGROUND)
 
     def start_convert_images_only(self):
-        thr = threading.Thread(target=self._convert_images_only_thread, daemon=True)
-        thr.start()
+        inp, out = self.input_folder.get().strip(), self.output_folder.get().strip()
+        self.submit_job(f"Convert to images {inp}", lambda engine: self._convert_images_only_job(engine, inp, out),
+                        PRIORITY_BACKGROUND)
 
-    def _convert_images_only_thread(self):
-        inp = self.input_folder.get().strip()
-        out = self.output_folder.get().strip()
-        poppler = self.poppler_path.get().strip()
-        dpi = int(self.dpi.get() or DEFAULT_DPI)
-        if not inp or not os.path.isdir(inp) or not out:
-            messagebox.showerror("Error", "Select valid input and output folders.")
-            return
-        self.progress["value"] = 0
-        pdfs = [f for f in os.listdir(inp) if f.lower().endswith(".pdf")]
-        self.progress["maximum"] = len(pdfs)
-        cnt = 0
-        for f in pdfs:
-            try:
-                src = os.path.join(inp, f)
-                name = os.path.splitext(f)[0]
-                out_dir = os.path.join(out, name)
-                os.makedirs(out_dir, exist_ok=True)
-                pages = convert_from_path(src, dpi=dpi, poppler_path=poppler)
-                for i, p in enumerate(pages, start=1):
-                    out_file = os.path.join(out_dir, f"{name}_page_{i}.png")
-                    p.save(out_file, "PNG")
-                self.log_print(f"Converted {f} -> {len(pages)} images.")
-            except Exception as e:
-                self.log_print("Error converting", f, ":", e)
-            cnt += 1
-            self.progress["value"] = cnt
-        self.log_print("Image conversion done.")
-
-    def _convert_folder_thread(self):
-        inp = self.input_folder.get().strip()
-        out = self.output_folder.get().strip()
-        poppler = self.poppler_path.get().strip()
-        tess = self.tesseract_cmd.get().strip()
-        lang = self.ocr_lang.get().strip()
-        dpi = int(self.dpi.get() or DEFAULT_DPI)
-
-        if not inp or not os.path.isdir(inp) or not out or not os.path.isdir(out):
-            messagebox.showerror("Error", "Select valid input and output folders.")
-            return
-        if not tess or not os.path.isfile(tess):
-            messagebox.showerror("Error", "Provide valid tesseract.exe path in Settings.")
-            return
+    def _convert_images_only_job(self, engine, inp, out):
+        try:
+            engine.convert_images_only(inp, out)
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            raise
 
-        pdfs = [f for f in os.listdir(inp) if f.lower().endswith(".pdf")]
-        if not pdfs:
+    def _convert_folder_job(self, engine, inp, out):
+        try:
+            summary = engine.convert_folder(inp, out)
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            raise
+        if not summary["files"]:
             messagebox.showinfo("Info", "No PDF files found in input folder.")
+        return summary
+
+    def start_watch(self):
+        # idle priority: runs whenever no other job is queued, paused (not stopped) while one is
+        inp, out = self.input_folder.get().strip(), self.output_folder.get().strip()
+        if not inp or not os.path.isdir(inp):
+            messagebox.showerror("Error", "Select a valid input folder to watch.")
             return
+        watcher = FolderWatcher(inp, out or None, self.collect_settings(), log=self.log_print)
+        self.submit_job(f"Watch {inp}" + (f" -> {out}" if out else " (index only)"),
+                        lambda engine: self._watch_job(engine, watcher), PRIORITY_IDLE)
 
-        # prepare output base
-        base_out = out
-        if self.create_subfolder.get():
-            base_out = os.path.join(out, DEFAULT_OUTPUT_DIRNAME)
-            os.makedirs(base_out, exist_ok=True)
-
-        self.progress["maximum"] = len(pdfs)
-        c = 0
-        for f in pdfs:
-            c += 1
-            self.status_label.config(text=f"Converting {f} ({c}/{len(pdfs)})")
-            src = os.path.join(inp, f)
-            name = os.path.splitext(f)[0]
-            temp_dir = os.path.join(base_out, name + "_imgs")
-            os.makedirs(temp_dir, exist_ok=True)
-            try:
-                # step1: PDF -> images
-                pages = convert_from_path(src, dpi=dpi, poppler_path=poppler)
-                img_files = []
-                for i, p in enumerate(pages, start=1):
-                    out_img = os.path.join(temp_dir, f"{name}_page_{i}.png")
-                    p.save(out_img, "PNG")
-                    img_files.append(out_img)
-                # step2: OCR images -> per-page pdfs -> merge
-                out_pdf_final = os.path.join(base_out, name + "_searchable.pdf")
-                make_searchable_from_images(img_files, out_pdf_final, tess, lang)
-                self.log_print(f"Converted: {f} -> {out_pdf_final}")
-                # cleanup temp per-page PDFs and images if wanted (commented)
-                # shutil.rmtree(temp_dir)
-            except Exception as e:
-                self.log_print("Error processing", f, ":", e)
-            self.progress["value"] = c
-
-        self.status_label.config(text="Conversion completed.")
-        self.log_print("All PDFs converted to searchable PDFs.")
+    def _watch_job(self, engine, watcher):
+        try:
+            return watcher.run(engine)
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            raise
 
     # ----------------- Search Flow -----------------
     def start_search_thread(self):
-        thr = threading.Thread(target=self._search_thread, daemon=True)
-        thr.start()
-
-    def _search_thread(self):
         folder = self.input_folder.get().strip()
-        terms_raw = self.search_terms.get().strip()
-        poppler = self.poppler_path.get().strip()
-        tess = self.tesseract_cmd.get().strip()
-        dpi = int(self.dpi.get() or DEFAULT_DPI)
-        fuzzy_thr = int(self.fuzzy.get() or DEFAULT_FUZZY)
-        lang = self.ocr_lang.get().strip()
-
-        if not folder or not os.path.isdir(folder):
-            messagebox.showerror("Error", "Select valid folder to search.")
-            return
-        if not terms_raw:
-            messagebox.showerror("Error", "Enter search terms (comma separated).")
+        keywords = [k.strip() for k in self.search_terms.get().split(",") if k.strip()]
+        engine = self.make_engine()
+        try:
+            engine.check_search(folder, keywords)
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
             return
-
-        keywords = [k.strip() for k in terms_raw.split(",") if k.strip()]
-        # reset
+        # reset; a search still running would only add rows that get dropped
+        self.stop_search()
         self.clear_results()
-
-        # collect files (pdf + images)
-        file_list = []
-        for root, _, files in os.walk(folder):
-            for f in files:
-                if f.lower().endswith((".pdf", ".png", ".jpg", ".jpeg")):
-                    file_list.append(os.path.join(root, f))
-
-        total = len(file_list)
-        if total == 0:
+        generation = self.search_generation
+        self.search_job = self.scheduler.submit(
+            f"Search {', '.join(keywords)} in {folder}", engine,
+            lambda engine: self._search_job(engine, folder, keywords, generation), PRIORITY_URGENT)
+
+    def stop_search(self):
+        job = self.search_job
+        if job is not None and not job.finished:
+            self.scheduler.cancel(job)
+            self.status_label.config(text="Stopping search...")
+
+    def _search_job(self, engine, folder, keywords, generation):
+        on_match = lambda file_path, rec: self._add_result(generation, rec)
+        summary = engine.search(folder, keywords, on_match=on_match)
+        if not summary["files"]:
             messagebox.showinfo("Info", "No searchable files found in folder.")
-            return
+        return summary
 
-        self.progress["maximum"] = total
-        processed = 0
-        for fp in file_list:
-            processed += 1
-            self.progress["value"] = processed
-            self.status_label.config(text=f"Scanning: {os.path.basename(fp)} ({processed}/{total})")
-            try:
-                if fp.lower().endswith(".pdf"):
-                    # try PyMuPDF text extraction first
-                    try:
-                        doc = fitz.open(fp)
-                        if doc.page_count == 0:
-                            doc.close()
-                            continue
-                        for pno in range(doc.page_count):
-                            page_text = normalize_text(doc[pno].get_text("text") or "")
-                            if page_text.strip():
-                                self._search_text_in_doc(fp, pno+1, page_text, keywords, "searchable", fuzzy_thr)
-                            else:
-                                # fallback OCR page
-                                page_txt = self._ocr_pdf_page(fp, pno+1, poppler, tess, lang, dpi)
-                                self._search_text_in_doc(fp, pno+1, page_txt, keywords, "ocr", fuzzy_thr)
-                        doc.close()
-                    except Exception:
-                        # fallback: convert each page to image and OCR
-                        doc = fitz.open(fp)
-                        for pno in range(doc.page_count):
-                            page_txt = self._ocr_pdf_page(fp, pno+1, poppler, tess, lang, dpi)
-                            self._search_text_in_doc(fp, pno+1, page_txt, keywords, "ocr", fuzzy_thr)
-                        doc.close()
-                else:
-                    # image file
-                    txt = self._ocr_image(fp, tess, lang)
-                    self._search_text_in_doc(fp, None, txt, keywords, "image", fuzzy_thr)
-            except Exception as e:
-                self.log_print("Scan error:", fp, e)
-
-        self.status_label.config(text="Search completed.")
-        self.log_print("Search done. Matches:", len(self.results))
-
-    def _search_text_in_doc(self, file_path, page_no, text, keywords, mode, fuzzy_threshold):
-        if not text:
+    # ----------------- Voter Records -----------------
+    def start_records_thread(self):
+        folder = self.input_folder.get().strip()
+        self.submit_job(f"Update records {folder}", lambda engine: self._records_job(engine, folder), PRIORITY_NORMAL)
+
+    def _records_job(self, engine, folder):
+        try:
+            summary = engine.build_records(folder)
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
+            raise
+        if not summary["files"]:
+            messagebox.showinfo("Info", "No roll files found in folder.")
+        return summary
+
+    def query_records(self):
+        # the Parquet store is read and filtered in a job; only the result table is drawn here
+        try:
+            age_min, age_max = parse_age_range(self.rec_age.get())
+        except EngineError as e:
+            messagebox.showerror("Error", str(e))
             return
-        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-        for idx, line in enumerate(lines):
-            for kw in keywords:
-                if fuzzy_match(line, kw, fuzzy_threshold):
-                    low = max(0, idx-1)
-                    high = min(len(lines)-1, idx+1)
-                    context = " | ".join(lines[low:high+1])
-                    rec = {
-                        "PDF File": os.path.basename(file_path),
-                        "Page": page_no if page_no else "",
-                        "Matched Term": kw,
-                        "Matched Line": line,
-                        "Context (3 lines)": context,
-                        "Mode": mode
-                    }
-                    self.results.append(rec)
-                    self.tree.insert("", END, values=[rec[c] for c in ["PDF File","Page","Matched Term","Matched Line","Context (3 lines)","Mode"]])
-
-    def _ocr_image(self, img_path, tess, lang):
+        folder = self.input_folder.get().strip()
+        filters = dict(folder=folder, surname=self.rec_surname.get().strip(), name=self.rec_name.get().strip(),
+                       age_min=age_min, age_max=age_max, ward=self.rec_ward.get().strip(),
+                       part=self.rec_part.get().strip(), gender=self.rec_gender.get(), phonetic=self.phonetic.get())
+        self.rec_label.config(text="Querying...")
+        self.submit_job(f"Query records {folder}", lambda engine: self._query_records_job(engine, filters),
+                        PRIORITY_URGENT)
+
+    def _query_records_job(self, engine, filters):
         try:
-            if tess:
-                pytesseract.pytesseract.tesseract_cmd = tess
-            img = Image.open(img_path)
-            txt = pytesseract.image_to_string(img, lang=lang)
-            img.close()
-            return normalize_text(txt)
+            df = engine.query_records(**filters)
         except Exception as e:
-            return ""
+            self.root.after(0, lambda: self.rec_label.config(text="Query failed"))
+            if isinstance(e, EngineError):
+                messagebox.showerror("Error", str(e))
+            raise
+        self.root.after(0, self.show_records, df)
+        return {"records": len(df)}
+
+    def show_records(self, df):
+        self.records_df = df
+        self.rec_tree.delete(*self.rec_tree.get_children())
+        for row in df.head(RECORDS_SHOWN).itertuples(index=False):
+            self.rec_tree.insert("", END, values=["" if v is None else v for v in row])
+        shown = f" (showing first {RECORDS_SHOWN:,})" if len(df) > RECORDS_SHOWN else ""
+        self.rec_label.config(text=f"{len(df):,} records match{shown}")
+
+    def export_records(self):
+        df = self.records_df
+        if df is None or not len(df):
+            messagebox.showinfo("Info", "No records to export.")
+            return
+        out = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="voter_records.csv",
+                                           filetypes=[("CSV","*.csv"), ("Excel","*.xlsx"), ("Parquet","*.parquet")])
+        if out:
+            rows = (dict(zip(RECORD_COLUMNS, row)) for row in df.itertuples(index=False))
+            self.start_export(rows, out, RECORD_COLUMNS, len(df))
 
-    def _ocr_pdf_page(self, pdf_path, page_no, poppler, tess, lang, dpi):
-        try:
-            images = convert_from_path(pdf_path, first_page=page_no, last_page=page_no, dpi=dpi, poppler_path=poppler)
-            if images:
-                if tess:
-                    pytesseract.pytesseract.tesseract_cmd = tess
-                txt = pytesseract.image_to_string(images[0], lang=lang)
-                images[0].close()
-                return normalize_text(txt)
-        except Exception as e:
-            return ""
-        return ""
+    def on_close(self):
+        for job in self.scheduler.active():
+            self.scheduler.cancel(job)
+        self.results.close()  # removes the spill file, if any
+        self.root.destroy()
 
     # ----------------- UI style / Dark mode -----------------
     def apply_style(self):
@@ -503,6 +727,7 @@ class GujaratiAllInOneGUI:
 # MAIN
 # -----------------------------
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # search worker processes in the PyInstaller build
     root = Tk()
-    app = GujaratiAllInOneGUI(root)
+    app = GujaratiAllInOneGUI(root, measure_startup="--startup-time" in sys.argv[1:])
     root.mainloop()
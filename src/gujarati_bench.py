@@ -0,0 +1,394 @@
+"""
+gujarati_bench.py
+Benchmark harness + synthetic Gujarati electoral-roll corpus generator.
+
+  python gujarati_bench.py generate CORPUS_DIR --files 20 --pages 10 --variant both
+  python gujarati_bench.py run CORPUS_DIR --json report.json [--ocr-pages 10] [--stages ...]
+  python gujarati_bench.py compare old.json new.json
+
+Each stage of the pipelines (rasterize, page preprocessing, png encode, tesseract, merge, get_text,
+normalize, fuzzy matching, end-to-end search) is timed separately and written as
+JSON so runs on different machines / commits can be compared.
+Author: SM TECHIE (adapted)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24 (importing "fitz" prints a deprecation notice to stdout)
+except ImportError:
+    import fitz  # PyMuPDF
+import rapidfuzz
+
+from gujarati_engine import (
+    DEFAULT_DPI, DEFAULT_FUZZY, DEFAULT_OCR_BATCH_PAGES, DEFAULT_OCR_LANG, DEFAULT_TESSERACT_CMD,
+    Engine, KeywordMatcher, PhoneticMatcher, fuzzy_match, phonetic_keys, normalize_text, ocr_image_to_text,
+    pixmap_to_image, run_tesseract_batch, tesseract_version,
+)
+
+STAGES = ["rasterize", "prepare_page", "png_encode", "tesseract_pdf", "tesseract_batch", "tesseract_txt", "merge", "get_text",
+          "normalize", "fuzzy", "fuzzy_legacy", "phonetic_keys", "phonetic_match", "search_scan", "search_index_cold", "search_index_warm",
+          "engine_import"]
+
+FIRST_NAMES = ["સલીમ", "ઇબ્રાહીમ", "રમેશ", "સુરેશ", "મહેશ", "અમિત", "ફાતિમા", "હસીના", "ગીતા", "સીતા",
+               "યુસુફ", "અહમદ", "કિરણ", "જયેશ", "નિલેશ", "રાજેશ", "ઝુબેદા", "આયશા", "પ્રવીણ", "હાર્દિક"]
+SURNAMES = ["મેમણ", "પટેલ", "શાહ", "દેસાઈ", "મકવાણા", "ચૌહાણ", "પરમાર", "સોલંકી", "વોરા", "ઘાંચી",
+            "મન્સુરી", "ત્રિવેદી", "જોષી", "રાઠોડ", "ભટ્ટ"]
+RELATIONS = ["પિતાનું નામ", "પતિનું નામ", "માતાનું નામ"]
+GENDERS = ["પુરુષ", "સ્ત્રી"]
+DEFAULT_TERMS = "મેમણ,સલીમ,પટેલ"
+
+# A4 roll page: 3 columns x 10 rows of voter cards under a header line
+PAGE_W, PAGE_H = 595, 842
+GRID_COLS, GRID_ROWS = 3, 10
+
+
+# -----------------------------
+# Synthetic corpus
+# -----------------------------
+def _card_html(rng, serial):
+    epic = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ") for _ in range(3)) + f"{rng.randrange(10**7):07d}"
+    surname = rng.choice(SURNAMES)
+    name = f"{rng.choice(FIRST_NAMES)} {surname}"
+    rel = f"{rng.choice(FIRST_NAMES)} {surname}"
+    html = (f"<div style='font-size:7px'>{serial} &nbsp; {epic}<br>"
+            f"નામ : {name}<br>{rng.choice(RELATIONS)} : {rel}<br>"
+            f"ઘર નંબર : {rng.randint(1, 999)}<br>"
+            f"ઉંમર : {rng.randint(18, 95)} &nbsp; જાતિ : {rng.choice(GENDERS)}</div>")
+    return html, surname
+
+
+def make_roll_page(doc, rng, page_no, first_serial, ward):
+    page = doc.new_page(width=PAGE_W, height=PAGE_H)
+    page.insert_htmlbox(fitz.Rect(30, 20, PAGE_W - 30, 50),
+                        f"<div style='font-size:9px'>વોર્ડ નં. {ward} &nbsp; ભાગ નં. {page_no}</div>")
+    cell_w = (PAGE_W - 60) / GRID_COLS
+    cell_h = (PAGE_H - 80) / GRID_ROWS
+    surnames = []
+    for i in range(GRID_COLS * GRID_ROWS):
+        row, col = divmod(i, GRID_COLS)
+        x0, y0 = 30 + col * cell_w, 60 + row * cell_h
+        html, surname = _card_html(rng, first_serial + i)
+        page.draw_rect(fitz.Rect(x0, y0, x0 + cell_w - 4, y0 + cell_h - 4), color=(0.6, 0.6, 0.6), width=0.5)
+        page.insert_htmlbox(fitz.Rect(x0 + 3, y0 + 3, x0 + cell_w - 6, y0 + cell_h - 6), html)
+        surnames.append(surname)
+    return surnames
+
+
+def scanned_copy(text_doc, dpi):
+    """Image-only copy of a document, like a scanned roll (no text layer)."""
+    out = fitz.open()
+    for page in text_doc:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        new = out.new_page(width=page.rect.width, height=page.rect.height)
+        new.insert_image(new.rect, pixmap=pix)
+    return out
+
+
+def generate_corpus(out_dir, files=10, pages=5, variant="both", seed=1, scan_dpi=200, log=print):
+    rng = random.Random(seed)
+    counts = {}
+    variants = ["text", "scanned"] if variant == "both" else [variant]
+    for v in variants:
+        os.makedirs(os.path.join(out_dir, v), exist_ok=True)
+    for n in range(1, files + 1):
+        doc = fitz.open()
+        ward = rng.randint(1, 40)
+        for p in range(1, pages + 1):
+            for s in make_roll_page(doc, rng, p, (p - 1) * GRID_COLS * GRID_ROWS + 1, ward):
+                counts[s] = counts.get(s, 0) + 1
+        doc.subset_fonts()  # every html box embeds the full Noto Gujarati font otherwise
+        name = f"roll_{n:04d}.pdf"
+        if "text" in variants:
+            doc.save(os.path.join(out_dir, "text", name), garbage=3, deflate=True)
+        if "scanned" in variants:
+            with scanned_copy(doc, scan_dpi) as scan:
+                scan.save(os.path.join(out_dir, "scanned", name), garbage=3, deflate=True)
+        doc.close()
+        log(f"Generated {name} ({n}/{files})")
+    meta = {"files": files, "pages_per_file": pages, "variants": variants, "seed": seed,
+            "cards_per_page": GRID_COLS * GRID_ROWS, "surname_counts": counts}
+    with open(os.path.join(out_dir, "corpus.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, ensure_ascii=False, indent=2)
+    return meta
+
+
+# -----------------------------
+# Timing
+# -----------------------------
+class StageTimer:
+    """Collects wall-clock samples per stage and summarizes them."""
+
+    def __init__(self):
+        self.samples = {}
+        self.extra = {}
+
+    @contextmanager
+    def measure(self, stage, items=1):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(stage, []).append((time.perf_counter() - t0, items))
+
+    def summary(self):
+        out = {}
+        for stage, samples in self.samples.items():
+            secs = sorted(s for s, _ in samples)
+            items = sum(n for _, n in samples)
+            total = sum(secs)
+            out[stage] = {
+                "count": len(secs),
+                "items": items,
+                "total_s": round(total, 4),
+                "mean_ms": round(1000 * total / len(secs), 3),
+                "p50_ms": round(1000 * statistics.median(secs), 3),
+                "p95_ms": round(1000 * secs[min(len(secs) - 1, int(0.95 * len(secs)))], 3),
+                "max_ms": round(1000 * secs[-1], 3),
+                "items_per_sec": round(items / total, 2) if total else None,
+            }
+            out[stage].update(self.extra.get(stage, {}))
+        return out
+
+
+# -----------------------------
+# Benchmark run
+# -----------------------------
+def _corpus_files(corpus_dir, variant):
+    folder = os.path.join(corpus_dir, variant)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".pdf"))
+
+
+def run_benchmark(corpus_dir, stages=None, dpi=DEFAULT_DPI, lang=DEFAULT_OCR_LANG, tesseract_cmd=DEFAULT_TESSERACT_CMD,
+                  terms=DEFAULT_TERMS, fuzzy=DEFAULT_FUZZY, ocr_pages=5, legacy_pages=3,
+                  batch_pages=DEFAULT_OCR_BATCH_PAGES, log=print):
+    stages = set(stages or STAGES)
+    timer = StageTimer()
+    text_files = _corpus_files(corpus_dir, "text")
+    scanned_files = _corpus_files(corpus_dir, "scanned")
+    tess = shutil.which(tesseract_cmd) or tesseract_cmd
+    has_tess = bool(tess) and os.path.isfile(tess)
+    keywords = [k.strip() for k in terms.split(",") if k.strip()]
+    matcher = KeywordMatcher(keywords, fuzzy)
+    phonetic = PhoneticMatcher(keywords, fuzzy)
+
+    # rasterize / png / tesseract / merge on the scanned variant (the Convert path)
+    raster_src = scanned_files or text_files
+    ocr_budget = ocr_pages
+    page_pdfs = []
+    ocr_pngs = []
+    prep_engine = Engine({"dpi": dpi})
+    prep_dpis, prep_regions = [], 0
+    if stages & {"rasterize", "prepare_page", "png_encode", "tesseract_pdf", "tesseract_batch", "tesseract_txt", "merge"}:
+        log("Benchmarking rasterize / tesseract ...")
+        for fp in raster_src:
+            with fitz.open(fp) as doc:
+                for page in doc:
+                    if "prepare_page" in stages:
+                        # probe + adaptive DPI + deskew + gray + column split (search-time OCR input)
+                        with timer.measure("prepare_page"):
+                            plan, regions = prep_engine.prepare_page(page, split=True)
+                        prep_dpis.append(plan["dpi"])
+                        prep_regions += len(regions)
+                    with timer.measure("rasterize"):
+                        pix = page.get_pixmap(dpi=dpi)
+                    with timer.measure("png_encode"):
+                        png = pix.tobytes("png")
+                    if has_tess and ocr_budget > 0:
+                        ocr_budget -= 1
+                        ocr_pngs.append(png)
+                        if "tesseract_pdf" in stages or "merge" in stages:
+                            # one tesseract process per page
+                            with timer.measure("tesseract_pdf"):
+                                page_pdfs.extend(run_tesseract_batch([png], tess, lang, dpi, "pdf"))
+                        if "tesseract_txt" in stages:
+                            img = pixmap_to_image(pix)
+                            with timer.measure("tesseract_txt"):
+                                ocr_image_to_text(img, lang, tess)
+                            img.close()
+                    elif not has_tess:
+                        # merge cost without OCR: use the source page itself
+                        one = fitz.open()
+                        one.insert_pdf(doc, from_page=page.number, to_page=page.number)
+                        page_pdfs.append(one.tobytes())
+                        one.close()
+        if "tesseract_batch" in stages:
+            # one tesseract process per `batch_pages` pages (multipage TIFF on stdin)
+            for i in range(0, len(ocr_pngs), batch_pages):
+                chunk = ocr_pngs[i:i + batch_pages]
+                with timer.measure("tesseract_batch", items=len(chunk)):
+                    run_tesseract_batch(chunk, tess, lang, dpi, "pdf")
+        if prep_dpis:
+            timer.extra["prepare_page"] = {"mean_dpi": round(sum(prep_dpis) / len(prep_dpis), 1),
+                                           "regions_per_page": round(prep_regions / len(prep_dpis), 2)}
+        if not has_tess:
+            timer.extra["tesseract_pdf"] = {"skipped": f"tesseract not found: {tesseract_cmd}"}
+        if "merge" in stages and page_pdfs:
+            with timer.measure("merge", items=len(page_pdfs)):
+                out = fitz.open()
+                for data in page_pdfs:
+                    with fitz.open("pdf", data) as one:
+                        out.insert_pdf(one)
+                out.tobytes(garbage=3, deflate=True)
+                out.close()
+
+    # text extraction + matching on the text-layer variant (the Search path)
+    page_texts = []
+    if stages & {"get_text", "normalize", "fuzzy", "fuzzy_legacy", "phonetic_keys", "phonetic_match"}:
+        log("Benchmarking get_text / normalize / fuzzy ...")
+        for fp in text_files:
+            with fitz.open(fp) as doc:
+                for page in doc:
+                    with timer.measure("get_text"):
+                        raw = page.get_text("text")
+                    with timer.measure("normalize"):
+                        page_texts.append(normalize_text(raw))
+        for text in page_texts:
+            lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+            if "fuzzy" in stages:
+                with timer.measure("fuzzy", items=len(lines) * len(keywords)):
+                    matcher.match_lines(lines)
+            if "phonetic_keys" in stages:
+                # what the index computes per page (word keys are memoized across pages)
+                with timer.measure("phonetic_keys"):
+                    phonetic_keys(text)
+            if "phonetic_match" in stages:
+                with timer.measure("phonetic_match", items=len(lines) * len(keywords)):
+                    phonetic.match_lines(lines)
+        if "fuzzy_legacy" in stages:
+            # the pre-KeywordMatcher nested loop, on a few pages only (it is slow)
+            for text in page_texts[:legacy_pages]:
+                lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+                with timer.measure("fuzzy_legacy", items=len(lines) * len(keywords)):
+                    [(i, kw) for i, ln in enumerate(lines) for kw in keywords if fuzzy_match(ln, kw, fuzzy)]
+
+    # end-to-end search latency over the whole text corpus
+    if stages & {"search_scan", "search_index_cold", "search_index_warm"} and text_files:
+        log("Benchmarking end-to-end search ...")
+        folder = os.path.join(corpus_dir, "text")
+        tmp = tempfile.mkdtemp(prefix="gujarati_bench_")
+        try:
+            base = {"tesseract_cmd": tesseract_cmd, "ocr_lang": lang, "dpi": dpi, "fuzzy": fuzzy,
+                    "ocr_cache_mb": 0, "index_path": os.path.join(tmp, "index.sqlite3")}
+            runs = [("search_scan", False), ("search_index_cold", True), ("search_index_warm", True)]
+            for stage, use_index in runs:
+                if stage not in stages:
+                    continue
+                engine = Engine(dict(base, use_index=use_index))
+                with timer.measure(stage, items=len(page_texts) or len(text_files)):
+                    summary = engine.search(folder, keywords)
+                timer.extra[stage] = {"matches": summary["matches"], "files": summary["files"]}
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    # cold-start cost of the engine in a fresh interpreter (what the GUI / CLI / every
+    # search worker process pays before doing anything)
+    if "engine_import" in stages:
+        log("Benchmarking engine import ...")
+        probe = "import time; t = time.perf_counter(); import gujarati_engine; print(time.perf_counter() - t)"
+        for _ in range(5):
+            res = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+            timer.samples.setdefault("engine_import", []).append((float(res.stdout.split()[-1]), 1))
+
+    meta_path = os.path.join(corpus_dir, "corpus.json")
+    corpus = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as fh:
+            corpus = {k: v for k, v in json.load(fh).items() if k != "surname_counts"}
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pymupdf": getattr(fitz, "VersionBind", "?"),
+            "rapidfuzz": rapidfuzz.__version__,
+            "tesseract": tesseract_version(tess) if has_tess else None,
+            "dpi": dpi, "lang": lang, "terms": keywords, "fuzzy": fuzzy,
+            "corpus": dict(corpus, text_files=len(text_files), scanned_files=len(scanned_files)),
+        },
+        "stages": timer.summary(),
+    }
+
+
+def compare_reports(old, new):
+    """Rows of (stage, old mean_ms, new mean_ms, change %) for stages in both reports."""
+    rows = []
+    for stage in STAGES:
+        a, b = old["stages"].get(stage), new["stages"].get(stage)
+        if a and b and a.get("mean_ms"):
+            rows.append((stage, a["mean_ms"], b["mean_ms"], 100.0 * (b["mean_ms"] - a["mean_ms"]) / a["mean_ms"]))
+    return rows
+
+
+# -----------------------------
+# MAIN
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gujarati_bench", description="Benchmarks for the Gujarati PDF tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="write a synthetic roll corpus")
+    p.add_argument("out_dir")
+    p.add_argument("--files", type=int, default=10)
+    p.add_argument("--pages", type=int, default=5, help="pages per file")
+    p.add_argument("--variant", choices=["text", "scanned", "both"], default="both")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--scan-dpi", type=int, default=200)
+
+    p = sub.add_parser("run", help="time each stage on a corpus")
+    p.add_argument("corpus_dir")
+    p.add_argument("--json", help="write the report here (default: stdout)")
+    p.add_argument("--stages", help="comma-separated subset of: " + ",".join(STAGES))
+    p.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    p.add_argument("--lang", default=DEFAULT_OCR_LANG)
+    p.add_argument("--tesseract", default=DEFAULT_TESSERACT_CMD)
+    p.add_argument("--terms", default=DEFAULT_TERMS)
+    p.add_argument("--fuzzy", type=int, default=DEFAULT_FUZZY)
+    p.add_argument("--ocr-pages", type=int, default=5, help="pages to OCR (tesseract is slow)")
+    p.add_argument("--batch-pages", type=int, default=DEFAULT_OCR_BATCH_PAGES, help="pages per tesseract call")
+
+    p = sub.add_parser("compare", help="compare two JSON reports")
+    p.add_argument("old")
+    p.add_argument("new")
+
+    args = parser.parse_args(argv)
+    log = lambda *a: print(" ".join(str(x) for x in a), file=sys.stderr)
+    if args.command == "generate":
+        generate_corpus(args.out_dir, args.files, args.pages, args.variant, args.seed, args.scan_dpi, log=log)
+        return 0
+    if args.command == "run":
+        stages = [s.strip() for s in args.stages.split(",")] if args.stages else None
+        report = run_benchmark(args.corpus_dir, stages, args.dpi, args.lang, args.tesseract,
+                               args.terms, args.fuzzy, args.ocr_pages, batch_pages=args.batch_pages, log=log)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as fh:
+                fh.write(text)
+        else:
+            print(text)
+        return 0
+    with open(args.old, encoding="utf-8") as fa, open(args.new, encoding="utf-8") as fb:
+        rows = compare_reports(json.load(fa), json.load(fb))
+    print(f"{'stage':<20}{'old ms':>12}{'new ms':>12}{'change':>10}")
+    for stage, a, b, pct in rows:
+        print(f"{stage:<20}{a:>12.3f}{b:>12.3f}{pct:>+9.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
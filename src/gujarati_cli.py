@@ -0,0 +1,244 @@
+"""
+gujarati_cli.py
+Headless Convert / Search for batch servers and cron, using the same engine and
+saved settings (~/.gujarati_pdf_tool/settings.json) as the GUI.
+
+  python gujarati_cli.py convert INPUT_DIR OUTPUT_DIR [--incremental] [--shard 0/4]
+  python gujarati_cli.py search FOLDER -t "મેમણ,સલીમ" [--format jsonl|csv] [-o results.jsonl]
+  python gujarati_cli.py records FOLDER [--surname પટેલ] [--age 30-40] [--ward 12] [--gender F]
+  python gujarati_cli.py watch INPUT_DIR [OUTPUT_DIR] [--poll] [--watch-workers 2]
+
+Results (one record per converted file / per match) go to stdout or --output,
+log lines go to stderr.
+Conversions resume where an interrupted run stopped and skip outputs that are
+newer than their source (--force reconverts everything).
+`records` brings the voter-record store up to date, then prints the records
+matching the filters.
+`watch` runs until interrupted: PDFs dropped into INPUT_DIR are converted into
+OUTPUT_DIR and indexed (without OUTPUT_DIR the dropped files are only indexed),
+one record per processed file.
+Exit status: 0 ok, 1 search / records found no matches, 2 bad arguments / settings,
+3 some files failed (or an unexpected error, e.g. an unwritable --output), 130 interrupted.
+Author: SM TECHIE (adapted)
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+import traceback
+
+from gujarati_engine import (
+    DEFAULT_SETTINGS_PATH, RECORD_COLUMNS, RESULT_COLUMNS,
+    Engine, EngineError, FolderWatcher, list_pdfs, list_search_files, load_settings, parse_age_range, shard_files,
+)
+
+EXIT_OK = 0
+EXIT_NO_MATCHES = 1
+EXIT_USAGE = 2
+EXIT_FAILED = 3
+EXIT_INTERRUPTED = 130
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--settings", default=DEFAULT_SETTINGS_PATH, help="settings JSON saved by the GUI")
+    common.add_argument("--tesseract", dest="tesseract_cmd", help="tesseract executable")
+    common.add_argument("--poppler", dest="poppler_path", help="poppler bin folder")
+    common.add_argument("--lang", dest="ocr_lang", help="Tesseract languages, e.g. guj+eng")
+    common.add_argument("--dpi", type=int)
+    common.add_argument("--workers", dest="ocr_workers", type=int, help="parallel OCR pages")
+    common.add_argument("--search-workers", dest="search_workers", type=int,
+                        help="processes reading / matching PDF text layers, 1 = in-process")
+    common.add_argument("--batch-pages", dest="ocr_batch_pages", type=int, help="pages per tesseract call")
+    common.add_argument("--min-dpi", dest="min_dpi", type=int, help="adaptive DPI floor, 0 = always use --dpi")
+    common.add_argument("--ocr-image", dest="ocr_image", choices=["color", "gray", "binary"])
+    common.add_argument("--no-deskew", dest="deskew", action="store_false", default=None)
+    common.add_argument("--cache-mb", dest="ocr_cache_mb", type=int, help="OCR cache size, 0 = off")
+    common.add_argument("--trace", dest="trace_path", help="write a Chrome-trace JSON of per-stage timings")
+    common.add_argument("--shard", help="only process shard K of N (e.g. 0/4) of the sorted file list")
+    common.add_argument("--output", "-o", help="write records here instead of stdout")
+    common.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    common.add_argument("--quiet", "-q", action="store_true", help="no log lines on stderr")
+
+    parser = argparse.ArgumentParser(prog="gujarati_cli", description="Gujarati PDF Converter & Search (headless)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", parents=[common], help="convert PDFs to searchable PDFs")
+    p.add_argument("input")
+    p.add_argument("output_dir")
+    p.add_argument("--no-subfolder", dest="create_subfolder", action="store_false", default=None,
+                   help="write into OUTPUT_DIR instead of OUTPUT_DIR/_searchable")
+    p.add_argument("--force", dest="skip_up_to_date", action="store_false", default=None,
+                   help="reconvert even when the output is newer than the source")
+    p.add_argument("--incremental", action="store_true", default=None,
+                   help="only convert PDFs that are new or changed since the last run")
+
+    p = sub.add_parser("search", parents=[common], help="search PDFs / images for terms")
+    p.add_argument("folder")
+    p.add_argument("--terms", "-t", required=True, help="comma-separated search terms")
+    p.add_argument("--fuzzy", type=int, help="fuzzy threshold (%%)")
+    p.add_argument("--phonetic", action="store_true", default=None,
+                   help="match spelling variants and Latin names through phonetic keys")
+    p.add_argument("--no-index", dest="use_index", action="store_false", default=None)
+    p.add_argument("--no-split", dest="crop_split", action="store_false", default=None,
+                   help="OCR whole pages instead of cropped voter-card columns")
+    p.add_argument("--index", dest="index_path", help="search index SQLite file")
+
+    p = sub.add_parser("records", parents=[common], help="extract voter records and query them")
+    p.add_argument("folder")
+    p.add_argument("--surname", help="last word of the voter's name")
+    p.add_argument("--name", help="part of the voter's name")
+    p.add_argument("--age", help="age or range, e.g. 35, 30-40, 60-")
+    p.add_argument("--ward")
+    p.add_argument("--part")
+    p.add_argument("--gender", help="M / F / O (or પુરુષ / સ્ત્રી)")
+    p.add_argument("--phonetic", action="store_true", default=None,
+                   help="match surname spelling variants and Latin spellings")
+    p.add_argument("--no-update", dest="update", action="store_false",
+                   help="query the stored records without re-reading changed files")
+    p.add_argument("--records-dir", dest="records_dir", help="Parquet record store folder")
+    p.add_argument("--index", dest="index_path", help="search index SQLite file")
+
+    p = sub.add_parser("watch", parents=[common], help="convert / index files as they arrive in a folder")
+    p.add_argument("input")
+    p.add_argument("output_dir", nargs="?", help="convert new PDFs here (omit to only index INPUT)")
+    p.add_argument("--no-subfolder", dest="create_subfolder", action="store_false", default=None,
+                   help="write into OUTPUT_DIR instead of OUTPUT_DIR/_searchable")
+    p.add_argument("--poll", dest="watch_polling", action="store_true", default=None,
+                   help="poll the folder instead of using filesystem events (network shares)")
+    p.add_argument("--watch-workers", dest="watch_workers", type=int, help="files processed at the same time")
+    p.add_argument("--index", dest="index_path", help="search index SQLite file")
+    return parser
+
+
+def settings_from_args(args):
+    settings = load_settings(args.settings)
+    for name in settings:
+        value = getattr(args, name, None)
+        if value is not None:
+            settings[name] = value
+    return settings
+
+
+class RecordWriter:
+    """Streams dict records as JSONL or CSV so large result sets never sit in memory."""
+
+    def __init__(self, fh, fmt, columns):
+        self.fh = fh
+        self.fmt = fmt
+        self.csv = csv.DictWriter(fh, fieldnames=columns, extrasaction="ignore") if fmt == "csv" else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, rec):
+        if self.csv:
+            self.csv.writerow(rec)
+        else:
+            self.fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self.fh.flush()
+
+
+def open_output(args):
+    if args.output:
+        return open(args.output, "w", encoding="utf-8-sig" if args.format == "csv" else "utf-8", newline="")
+    sys.stdout.reconfigure(encoding="utf-8")
+    return sys.stdout
+
+
+def cmd_convert(args, engine):
+    engine.check_convert(args.input, args.output_dir)
+    files = shard_files(list_pdfs(args.input), args.shard) if args.shard else None
+    fh = open_output(args)
+    try:
+        writer = RecordWriter(fh, args.format, ["file", "output", "status", "error"])
+        summary = engine.convert_folder(args.input, args.output_dir, files=files, on_file=writer.write)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return EXIT_FAILED if summary["failed"] else EXIT_OK
+
+
+def cmd_search(args, engine):
+    keywords = [k.strip() for k in args.terms.split(",") if k.strip()]
+    engine.check_search(args.folder, keywords)
+    files = shard_files(list_search_files(args.folder), args.shard) if args.shard else None
+    fh = open_output(args)
+    try:
+        writer = RecordWriter(fh, args.format, ["path"] + RESULT_COLUMNS)
+        summary = engine.search(args.folder, keywords, files=files,
+                                on_match=lambda path, rec: writer.write(dict(rec, path=path)))
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    if summary["errors"]:
+        return EXIT_FAILED
+    return EXIT_OK if summary["matches"] else EXIT_NO_MATCHES
+
+
+def cmd_records(args, engine):
+    age_min, age_max = parse_age_range(args.age)
+    if args.update:
+        engine.check_records(args.folder)
+        files = shard_files(list_search_files(args.folder), args.shard) if args.shard else None
+        summary = engine.build_records(args.folder, files=files)
+        if summary["errors"]:
+            return EXIT_FAILED
+    df = engine.query_records(folder=args.folder, surname=args.surname, name=args.name, age_min=age_min,
+                              age_max=age_max, ward=args.ward, part=args.part, gender=args.gender,
+                              phonetic=bool(engine.settings.get("phonetic")))
+    fh = open_output(args)
+    try:
+        writer = RecordWriter(fh, args.format, RECORD_COLUMNS)
+        for rec in df.astype(object).where(df.notna(), None).to_dict("records"):
+            writer.write(rec)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return EXIT_OK if len(df) else EXIT_NO_MATCHES
+
+
+def cmd_watch(args, engine):
+    fh = open_output(args)
+    try:
+        writer = RecordWriter(fh, args.format, ["file", "output", "status", "error"])
+        counts = FolderWatcher(args.input, args.output_dir, engine.settings, log=engine.log,
+                               on_file=writer.write).run(engine)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+    return EXIT_FAILED if counts["failed"] else EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    log = None if args.quiet else (lambda *a: print(" ".join(str(x) for x in a), file=sys.stderr))
+    try:
+        engine = Engine(settings_from_args(args), log=log)
+        if args.command == "convert":
+            return cmd_convert(args, engine)
+        if args.command == "records":
+            return cmd_records(args, engine)
+        if args.command == "watch":
+            return cmd_watch(args, engine)
+        return cmd_search(args, engine)
+    except EngineError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        # conversions pick up from their last checkpoint on the next run
+        print("interrupted", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    except Exception:
+        # never exit 1 on a crash: scripts read that as "no matches"
+        traceback.print_exc()
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # search worker processes in a frozen build
+    sys.exit(main())
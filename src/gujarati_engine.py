@@ -0,0 +1,3034 @@
+"""
+gujarati_engine.py
+Convert / search engine behind GujaratiAllInOneGUI_v2.py and gujarati_cli.py.
+No Tk in here: everything takes a settings dict (same keys as the Settings tab)
+and reports through plain log / progress callbacks.
+Author: SM TECHIE (adapted)
+"""
+
+import os
+import re
+import atexit
+import csv
+import itertools
+import json
+import subprocess
+import threading
+import multiprocessing
+import unicodedata
+import shutil
+import sqlite3
+import tempfile
+import hashlib
+import functools
+import importlib
+import time
+import io
+import math
+import bisect
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# -----------------------------
+# Lazy imports
+# -----------------------------
+class LazyModule:
+    """Stands in for a heavy dependency and imports it on first attribute access, so the
+    GUI window (and every CLI run / search worker) starts without paying for PyMuPDF,
+    numpy, openpyxl and pyarrow up front. `names` are tried in order."""
+
+    def __init__(self, *names):
+        self._names = names
+        self._module = None
+        self._error = None
+        self._lock = threading.Lock()
+        LAZY_MODULES.append(self)
+
+    def _load(self):
+        if self._module is not None:
+            return self._module
+        with self._lock:
+            if self._module is None:
+                if self._error is not None:
+                    raise self._error
+                error = None
+                for name in self._names:
+                    try:
+                        self._module = importlib.import_module(name)
+                        break
+                    except ImportError as e:
+                        error = error or e
+                else:
+                    # only once every name failed: another thread must never see a fallback's miss
+                    self._error = error
+                    raise error
+            return self._module
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            # introspection (inspect / doctest / pickle probing __wrapped__ etc.) must not import
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._names[0]}>"
+
+def module_available(module):
+    """True once `module` is imported (importing it now if needed); False if it is not installed."""
+    try:
+        module._load()
+        return True
+    except ImportError:
+        return False
+
+def preload_modules(modules=None):
+    """Import the lazy dependencies now; the GUI runs this in the background once its
+    window is up. Returns [(module name, seconds, installed)]."""
+    times = []
+    for module in modules or LAZY_MODULES:
+        t0 = time.perf_counter()
+        ok = module_available(module)
+        times.append((module._names[0], time.perf_counter() - t0, ok))
+    return times
+
+LAZY_MODULES = []
+# PyMuPDF >= 1.24 is "pymupdf" (importing "fitz" prints a deprecation notice to stdout)
+fitz = LazyModule("pymupdf", "fitz")
+np = LazyModule("numpy")
+Image = LazyModule("PIL.Image")
+fuzz = LazyModule("rapidfuzz.fuzz")
+process = LazyModule("rapidfuzz.process")
+pdf2image = LazyModule("pdf2image")
+openpyxl = LazyModule("openpyxl")
+openpyxl_cell = LazyModule("openpyxl.cell.cell")
+tesserocr = LazyModule("tesserocr")  # optional: in-process Tesseract API (one warm engine per worker thread)
+pa = LazyModule("pyarrow")  # optional: Parquet store for the structured voter records
+pc = LazyModule("pyarrow.compute")
+pq = LazyModule("pyarrow.parquet")
+watchdog_observers = LazyModule("watchdog.observers")  # optional: filesystem events for watch mode
+
+# -----------------------------
+# DEFAULT CONFIG - edit if needed
+# -----------------------------
+if os.name == "nt":
+    DEFAULT_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+    DEFAULT_POPPLER_PATH = r"C:\Program Files\poppler-25.07.0\Library\bin"
+else:
+    # Linux / batch servers: use tesseract and pdftoppm from PATH
+    DEFAULT_TESSERACT_CMD = "tesseract"
+    DEFAULT_POPPLER_PATH = ""
+DEFAULT_OCR_LANG = "guj+eng"
+DEFAULT_DPI = 250
+DEFAULT_FUZZY = 70
+DEFAULT_OUTPUT_DIRNAME = "_searchable"
+DEFAULT_OCR_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DEFAULT_SEARCH_WORKERS = os.cpu_count() or 1  # processes reading / matching text layers, 1 = in-process
+DEFAULT_OCR_BATCH_PAGES = 4  # pages per tesseract process (traineddata loads once per batch)
+DEFAULT_MIN_DPI = 150  # adaptive DPI never goes below this; 0 = always render at DEFAULT_DPI
+DEFAULT_OCR_IMAGE = "gray"  # what Tesseract gets: color / gray / binary
+DEFAULT_APP_DIR = os.path.join(os.path.expanduser("~"), ".gujarati_pdf_tool")
+DEFAULT_INDEX_PATH = os.path.join(DEFAULT_APP_DIR, "page_index.sqlite3")
+DEFAULT_OCR_CACHE_PATH = os.path.join(DEFAULT_APP_DIR, "ocr_cache.sqlite3")
+DEFAULT_OCR_CACHE_MB = 512
+DEFAULT_SETTINGS_PATH = os.path.join(DEFAULT_APP_DIR, "settings.json")
+DEFAULT_RESULTS_MEMORY_MB = 64
+DEFAULT_RECORDS_DIR = os.path.join(DEFAULT_APP_DIR, "records")
+CONVERT_MANIFEST_NAME = ".convert_manifest.sqlite3"
+CHECKPOINT_PAGES = 25  # flush a partial output (and its manifest row) every N pages
+SEARCH_CHUNK_PAGES = 32  # pages per search worker task; bigger PDFs are split into page ranges
+DEFAULT_WATCH_WORKERS = 2  # watch mode: files converted / indexed at the same time
+WATCH_SETTLE_SECS = 2.0  # a dropped file must be unchanged this long before it is read
+WATCH_POLL_SECS = 5.0  # polling fallback interval
+WATCH_TICK_SECS = 0.5
+WATCH_NO_EOF_SECS = 15.0  # a PDF without a trailing %%EOF is taken once unchanged this long and it opens
+WATCH_REPORT_SECS = 300.0  # watch mode logs one timing table per interval, not one per file
+
+# everything the Settings tab edits; saved as JSON and shared with the CLI
+DEFAULT_SETTINGS = {
+    "tesseract_cmd": DEFAULT_TESSERACT_CMD,
+    "poppler_path": DEFAULT_POPPLER_PATH,
+    "ocr_lang": DEFAULT_OCR_LANG,
+    "dpi": DEFAULT_DPI,
+    "fuzzy": DEFAULT_FUZZY,
+    "ocr_workers": DEFAULT_OCR_WORKERS,
+    "ocr_batch_pages": DEFAULT_OCR_BATCH_PAGES,
+    "search_workers": DEFAULT_SEARCH_WORKERS,
+    "min_dpi": DEFAULT_MIN_DPI,
+    "ocr_image": DEFAULT_OCR_IMAGE,
+    "deskew": True,
+    "crop_split": True,  # search OCR: crop margins, OCR each voter-card column separately
+    "phonetic": False,  # match spelling variants / Latin names through phonetic keys
+    "create_subfolder": True,
+    "skip_up_to_date": True,
+    "incremental": False,
+    "use_index": True,
+    "index_path": DEFAULT_INDEX_PATH,
+    "ocr_cache_mb": DEFAULT_OCR_CACHE_MB,
+    "trace_path": "",  # Chrome-trace JSON of the last run's timing spans, "" = off
+    "records_dir": DEFAULT_RECORDS_DIR,
+    "watch_workers": DEFAULT_WATCH_WORKERS,
+    "watch_polling": False,  # watch mode: poll instead of filesystem events (network shares)
+}
+
+# bump when extract_file_pages changes what it stores, so the index re-reads files
+EXTRACT_VERSION = 2
+# a text layer shorter than this on a page that also carries images is treated as a
+# scan with a stamped header/footer and OCR'd
+MIN_TEXT_LAYER_CHARS = 40
+# page analysis runs on a small render; Tesseract reads lines of about this many
+# pixels (matras included) reliably, so the page DPI is picked to hit it
+PROBE_DPI = 100
+TARGET_LINE_PX = 32
+MAX_SKEW_DEG = 3.0
+# characters legacy (non-Unicode) Gujarati fonts typically map their glyphs to
+LEGACY_FONT_PUNCT = set("{}[]|\\^~`@#$%&*_=+<>;")
+
+RESULT_COLUMNS = ["PDF File", "Page", "Matched Term", "Matched Line", "Context (3 lines)", "Mode"]
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def normalize_text(s):
+    if not s:
+        return ""
+    t = unicodedata.normalize("NFC", s)
+    t = t.replace("\u200c", "").replace("\u200d", "")
+    return t.strip()
+
+def fuzzy_score(a, b):
+    try:
+        return fuzz.partial_ratio(a.lower(), b.lower())
+    except Exception:
+        return 0
+
+def fuzzy_match(line, term, threshold):
+    ln = normalize_text(line)
+    tm = normalize_text(term)
+    if tm in ln:
+        return True
+    return fuzzy_score(tm, ln) >= threshold
+
+class KeywordMatcher:
+    """Batch form of fuzzy_match: keywords are normalized once and a whole page of
+    lines is scored against all of them in one rapidfuzz.process.cdist call.
+
+    At threshold 100 a keyword matches only lines that contain it (case-insensitive).
+    partial_ratio also scores 100 when the line is a piece of the keyword ("મેમ" for
+    "મેમણ"); that is dropped on purpose, so the index's trigram prefilter (which finds
+    pages containing the whole keyword) and a full scan return the same hits."""
+
+    def __init__(self, keywords, threshold, workers=-1):
+        self.keywords = list(keywords)
+        self.terms = [normalize_text(k) for k in self.keywords]
+        self.terms_lower = [t.lower() for t in self.terms]
+        self.threshold = threshold
+        self.workers = workers
+
+    def match_lines(self, lines):
+        """Return [(line_idx, keyword_idx)] in the same order as the old lines x keywords loop."""
+        if not lines or not self.terms:
+            return []
+        norm = [normalize_text(ln) for ln in lines]
+        # roll pages repeat labels ("નામ", "ઉંમર", ...) on every card: score each distinct line once
+        uniq, inverse = np.unique(np.array(norm, dtype=object), return_inverse=True)
+        uniq_lower = [ln.lower() for ln in uniq]
+        if self.threshold >= 100:
+            # nothing fuzzy left to do: the keyword must occur in the line
+            hits = np.array([[t in ln for ln in uniq_lower] for t in self.terms_lower], dtype=bool)
+        else:
+            scores = process.cdist(self.terms_lower, uniq_lower, scorer=fuzz.partial_ratio,
+                                   score_cutoff=self.threshold, workers=self.workers)
+            hits = scores >= self.threshold
+            # an empty term is contained in every line, as in fuzzy_match
+            for ti, t in enumerate(self.terms):
+                if not t:
+                    hits[ti, :] = True
+        line_idx, kw_idx = np.nonzero(hits[:, inverse.ravel()].T)
+        return list(zip(line_idx.tolist(), kw_idx.tolist()))
+
+# -----------------------------
+# Gujarati folding, transliteration and phonetic keys
+# -----------------------------
+# spelling variants (and the usual Tesseract confusions between them) folded away:
+# nukta, candra vowels, chandrabindu, vowel length, retroflex n / l, sha / ssa
+GUJ_FOLD = str.maketrans({
+    "\u0abc": None, "ૅ": "ે", "ૉ": "ો", "ઍ": "એ", "ઑ": "ઓ", "ઁ": "ં",
+    "ી": "િ", "ૂ": "ુ", "ઈ": "ઇ", "ઊ": "ઉ", "ૄ": "ૃ", "ૠ": "ઋ",
+    "ણ": "ન", "ળ": "લ", "ષ": "શ",
+    **{chr(0x0AE6 + d): str(d) for d in range(10)},
+})
+GUJ_CONSONANTS = {
+    "ક": "k", "ખ": "kh", "ગ": "g", "ઘ": "gh", "ઙ": "n", "ચ": "ch", "છ": "chh", "જ": "j", "ઝ": "jh",
+    "ઞ": "n", "ટ": "t", "ઠ": "th", "ડ": "d", "ઢ": "dh", "ણ": "n", "ત": "t", "થ": "th", "દ": "d",
+    "ધ": "dh", "ન": "n", "પ": "p", "ફ": "f", "બ": "b", "ભ": "bh", "મ": "m", "ય": "y", "ર": "r",
+    "લ": "l", "ળ": "l", "વ": "v", "શ": "sh", "ષ": "sh", "સ": "s", "હ": "h",
+}
+GUJ_VOWELS = {
+    "અ": "a", "આ": "aa", "ઇ": "i", "ઈ": "ee", "ઉ": "u", "ઊ": "oo", "ઋ": "ru", "ૠ": "ru", "એ": "e",
+    "ઐ": "ai", "ઓ": "o", "ઔ": "au", "ઍ": "e", "ઑ": "o", "ૐ": "om",
+}
+GUJ_MATRAS = {
+    "ા": "aa", "િ": "i", "ી": "ee", "ુ": "u", "ૂ": "oo", "ૃ": "ru", "ૄ": "ru", "ે": "e", "ૈ": "ai",
+    "ો": "o", "ૌ": "au", "ૅ": "e", "ૉ": "o", "ં": "n", "ઁ": "n", "ઃ": "h", "્": "", "\u0abc": "",
+}
+LATIN_FOLD = [("aa", "a"), ("ee", "i"), ("oo", "u")]
+# sound classes: aspirates fold into the plain stop, b/v and j/z merge, s/sh merge
+KEY_FOLD = [("chh", "c"), ("ch", "c"), ("kh", "k"), ("gh", "g"), ("jh", "j"), ("th", "t"), ("dh", "d"),
+            ("ph", "f"), ("bh", "b"), ("sh", "s"), ("ck", "k"), ("q", "k"), ("x", "ks"), ("z", "j"),
+            ("w", "b"), ("v", "b")]
+WORD_RE = re.compile(r"[\u0A81-\u0AE3A-Za-z]+")
+# bump when fold_gujarati / transliterate / phonetic_key change; the index rebuilds its keys
+PHONETIC_VERSION = 2
+
+def fold_gujarati(text):
+    """normalize_text plus folding of Gujarati spelling variants (see GUJ_FOLD)."""
+    return normalize_text(text).translate(GUJ_FOLD)
+
+def transliterate(text):
+    """Gujarati -> lowercase Latin (ITRANS-like, final schwa dropped); other text is lowercased."""
+    out = []
+    n = len(text)
+    for i, ch in enumerate(text):
+        if ch in GUJ_CONSONANTS:
+            out.append(GUJ_CONSONANTS[ch])
+            nxt = text[i + 1] if i + 1 < n else ""
+            # inherent "a" unless a vowel sign / virama follows or the word ends
+            if (nxt and nxt in "ંઁઃ") or (nxt not in GUJ_MATRAS and (nxt in GUJ_CONSONANTS or nxt in GUJ_VOWELS)):
+                out.append("a")
+        elif ch in GUJ_MATRAS:
+            out.append(GUJ_MATRAS[ch])
+        elif ch in GUJ_VOWELS:
+            out.append(GUJ_VOWELS[ch])
+        else:
+            out.append(ch.lower())
+    return "".join(out)
+
+@functools.lru_cache(maxsize=200000)
+def word_forms(word):
+    """(phonetic key, folded Latin spelling) of one word; Gujarati and Latin
+    spellings of the same name share the key ("મેમણ", "મેમન", "Memon" -> "mmn").
+
+    >>> word_forms("મેમણ"), word_forms("મેમન"), word_forms("Memon")
+    (('mmn', 'meman'), ('mmn', 'meman'), ('mmn', 'memon'))
+    """
+    latin = re.sub(r"[^a-z]", "", transliterate(fold_gujarati(word)))
+    for a, b in LATIN_FOLD:
+        latin = latin.replace(a, b)
+    if not latin:
+        return "", ""
+    k = latin
+    for a, b in KEY_FOLD:
+        k = k.replace(a, b)
+    k = re.sub(r"(.)\1+", r"\1", k)
+    k = re.sub(r"n(?=[^aeiouy])", "", k)  # anusvara before a consonant is often dropped
+    head = "a" if k[0] in "aeiou" else k[0]
+    return head + re.sub(r"[aeiouh]", "", k[1:]), latin
+
+def phonetic_key(word):
+    return word_forms(word)[0]
+
+def phonetic_keys(text):
+    """Distinct phonetic keys of every word in `text`."""
+    return {k for k in (phonetic_key(w) for w in WORD_RE.findall(text)) if k}
+
+class PhoneticMatcher:
+    """Variant-spelling matcher with KeywordMatcher's interface. A line matches a
+    keyword when each word of the keyword has a line word with the same phonetic
+    key whose folded Latin spellings are at least `threshold` similar, so it works
+    across spelling variants, common OCR confusions and Gujarati / Latin script."""
+
+    def __init__(self, keywords, threshold):
+        self.keywords = list(keywords)
+        self.terms = [normalize_text(k) for k in self.keywords]
+        self.threshold = threshold
+        self.word_groups = [[word_forms(w) for w in WORD_RE.findall(t) if word_forms(w)[0]] for t in self.terms]
+        # what the index is asked for: pages holding every key of a keyword
+        self.key_groups = [sorted({k for k, _ in g}) for g in self.word_groups]
+
+    def match_lines(self, lines):
+        hits = []
+        for li, line in enumerate(lines):
+            words = {}
+            for w in WORD_RE.findall(line):
+                k, latin = word_forms(w)
+                if k:
+                    words.setdefault(k, []).append(latin)
+            if not words:
+                continue
+            for ki, group in enumerate(self.word_groups):
+                if group and all(any(fuzz.ratio(latin, cand) >= self.threshold for cand in words.get(k, ()))
+                                 for k, latin in group):
+                    hits.append((li, ki))
+        return hits
+
+def text_layer_usable(text, max_odd_ratio=0.2):
+    """True when an embedded text layer can be searched as is.
+
+    Legacy-font PDFs extract as Latin-1 / private-use / symbol soup instead of
+    Gujarati code points; those pages (and empty ones) need OCR instead.
+    """
+    if not text or not text.strip():
+        return False
+    good = odd = 0
+    for ch in text:
+        cp = ord(ch)
+        if 0x0A80 <= cp <= 0x0AFF:
+            good += 1
+        elif cp < 0x80:
+            if ch.isalnum():
+                good += 1
+            elif ch in LEGACY_FONT_PUNCT:
+                odd += 1
+        elif 0xE000 <= cp <= 0xF8FF or 0x00A0 <= cp <= 0x024F or cp == 0xFFFD:
+            odd += 1
+        elif unicodedata.category(ch) in ("Co", "Cn", "Cc", "So"):
+            odd += 1
+        elif ch.isalnum():
+            good += 1
+    return odd <= max_odd_ratio * (good + odd)
+
+def pixmap_to_image(pix):
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+def _tesseract_env():
+    # the OCR pool already runs one tesseract per core; keep each one single-threaded
+    env = dict(os.environ)
+    env.setdefault("OMP_THREAD_LIMIT", "1")
+    return env
+
+def _as_pil(image):
+    return Image.open(io.BytesIO(image)) if isinstance(image, (bytes, bytearray)) else image
+
+def multipage_tiff(images, dpi=0):
+    """Pack PIL images / encoded image bytes into one multipage TIFF (LZW)."""
+    frames = [_as_pil(im) for im in images]
+    buf = io.BytesIO()
+    extra = {"dpi": (dpi, dpi)} if dpi else {}
+    frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:], compression="tiff_lzw", **extra)
+    return buf.getvalue()
+
+def split_pdf_pages(pdf_bytes, expected):
+    """Single-page PDF bytes for each page of a multi-page PDF."""
+    pages = []
+    with fitz.open("pdf", pdf_bytes) as doc:
+        if doc.page_count != expected:
+            raise RuntimeError(f"tesseract returned {doc.page_count} pages for {expected} images")
+        for pno in range(doc.page_count):
+            with fitz.open() as one:
+                one.insert_pdf(doc, from_page=pno, to_page=pno)
+                pages.append(one.tobytes())
+    return pages
+
+def run_tesseract_batch(images, tesseract_cmd, lang, dpi=0, kind="pdf"):
+    """OCR several images with ONE tesseract process, so guj/eng traineddata is loaded
+    once per batch instead of once per page. A single encoded image goes to stdin as is,
+    several go as a multipage TIFF. Returns per image: single-page PDF bytes ("pdf", or
+    "textpdf" for the invisible text layer without the image) or text ("txt").
+    """
+    if len(images) == 1 and isinstance(images[0], (bytes, bytearray)):
+        data = images[0]
+    else:
+        data = multipage_tiff(images, dpi)
+    cmd = [tesseract_cmd, "stdin", "stdout", "-l", lang]
+    if dpi:
+        cmd += ["--dpi", str(dpi)]
+    if kind == "textpdf":
+        cmd += ["-c", "textonly_pdf=1"]
+    if kind in ("pdf", "textpdf"):
+        cmd.append("pdf")
+    res = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=_tesseract_env(),
+                         creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr.decode("utf-8", "replace").strip() or "tesseract failed")
+    if kind in ("pdf", "textpdf"):
+        if not res.stdout.startswith(b"%PDF"):
+            raise RuntimeError(res.stderr.decode("utf-8", "replace").strip() or "tesseract produced no PDF")
+        return split_pdf_pages(res.stdout, len(images))
+    # the text renderer separates pages with a form feed
+    texts = res.stdout.decode("utf-8", "replace").split("\f")
+    if len(texts) < len(images):
+        raise RuntimeError(f"tesseract returned {len(texts)} pages for {len(images)} images")
+    return texts[:len(images)]
+
+_tesserocr_local = threading.local()
+
+def tesserocr_text(image, lang, tesseract_cmd, dpi=0):
+    """Text of one image from this thread's warm in-process engine (tesserocr), created on first use."""
+    api = getattr(_tesserocr_local, "api", None)
+    if api is None or _tesserocr_local.lang != lang:
+        if api is not None:
+            api.End()
+        tessdata = os.path.join(os.path.dirname(tesseract_cmd), "tessdata") if tesseract_cmd else ""
+        kwargs = {"path": tessdata + os.sep} if os.path.isdir(tessdata) else {}
+        api = _tesserocr_local.api = tesserocr.PyTessBaseAPI(lang=lang, **kwargs)
+        _tesserocr_local.lang = lang
+    api.SetImage(_as_pil(image))
+    if dpi:
+        api.SetSourceResolution(dpi)
+    return api.GetUTF8Text()
+
+def ocr_images(images, tesseract_cmd, lang, kind="txt", cache=None, dpi=0):
+    """OCR a batch of PIL images / encoded image bytes, one result per image.
+
+    Cache hits are answered first; the misses go to a warm engine in one call:
+    tesserocr in-process for text when it is installed, else one tesseract process.
+    """
+    if kind == "txt" and module_available(tesserocr):
+        kind = "txt-api"  # different engine build, different cache entries
+    results = [None] * len(images)
+    keys = [None] * len(images)
+    if cache is not None:
+        for i, image in enumerate(images):
+            digest = hashlib.sha1(image).hexdigest() if isinstance(image, (bytes, bytearray)) else image_digest(image)
+            keys[i] = ocr_cache_key(digest, kind, lang, dpi, tesseract_cmd)
+            cached = cache.get(keys[i])
+            if cached is not None:
+                results[i] = cached if kind in ("pdf", "textpdf") else cached.decode("utf-8")
+    todo = [i for i, r in enumerate(results) if r is None]
+    if not todo:
+        return results
+    batch = [images[i] for i in todo]
+    if kind == "txt-api":
+        out = [tesserocr_text(image, lang, tesseract_cmd, dpi) for image in batch]
+    else:
+        out = run_tesseract_batch(batch, tesseract_cmd, lang, dpi, "txt" if kind == "txt" else kind)
+    for i, value in zip(todo, out):
+        if kind in ("txt", "txt-api"):
+            value = normalize_text(value)
+        results[i] = value
+        if keys[i] is not None:
+            cache.put(keys[i], value.encode("utf-8") if kind in ("txt", "txt-api") else value)
+    return results
+
+def ocr_image_to_text(img, lang, tesseract_cmd, cache=None, dpi=0):
+    return ocr_images([img], tesseract_cmd, lang, "txt", cache, dpi)[0]
+
+def count_pdf_pages(pdf_path):
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+class PageThroughput:
+    """Thread-safe page counters for the OCR pool (pages/sec, queue depth)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.submitted = 0
+        self.done = 0
+
+    def add_submitted(self, n=1):
+        with self.lock:
+            self.submitted += n
+
+    def page_done(self, _future=None, n=1):
+        with self.lock:
+            self.done += n
+
+    def queue_depth(self):
+        with self.lock:
+            return self.submitted - self.done
+
+    def pages_per_sec(self):
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+class Profiler:
+    """Thread-safe timing spans and counters for one convert / search run.
+
+    Spans are aggregated per name (count / total / max, inclusive of nested spans);
+    the raw spans are only kept when a Chrome-trace export is wanted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, keep_spans=False):
+        with self.lock:
+            self.t0 = time.perf_counter()
+            self.stats = {}  # name -> [count, total_s, max_s]
+            self.counters = {}
+            self.spans = [] if keep_spans else None
+            self.threads = {}
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, args)
+
+    def add(self, name, start, dur, args=None):
+        with self.lock:
+            st = self.stats.get(name)
+            if st is None:
+                st = self.stats[name] = [0, 0.0, 0.0]
+            st[0] += 1
+            st[1] += dur
+            st[2] = max(st[2], dur)
+            if self.spans is not None:
+                tid = threading.get_ident()
+                self.threads.setdefault(tid, threading.current_thread().name)
+                self.spans.append((name, start, dur, tid, args))
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """Add the stage totals and counters of another run's profiler (spans are not carried over)."""
+        with other.lock:
+            stats = {name: list(st) for name, st in other.stats.items()}
+            counters = dict(other.counters)
+        with self.lock:
+            for name, (n, total, mx) in stats.items():
+                st = self.stats.setdefault(name, [0, 0.0, 0.0])
+                st[0] += n
+                st[1] += total
+                st[2] = max(st[2], mx)
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary_lines(self):
+        with self.lock:
+            stats = sorted(self.stats.items(), key=lambda kv: -kv[1][1])
+            counters = sorted(self.counters.items())
+            wall = time.perf_counter() - self.t0
+        lines = [f"{'stage':<16}{'count':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}"]
+        for name, (n, total, mx) in stats:
+            lines.append(f"{name:<16}{n:>8}{total:>10.2f}{1000 * total / n:>10.1f}{1000 * mx:>10.1f}")
+        lines.append(f"wall {wall:.2f}s (stage totals add up across worker threads); "
+                     + ", ".join(f"{k}: {v}" for k, v in counters))
+        return lines
+
+    def write_chrome_trace(self, path):
+        """Write the kept spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        with self.lock:
+            events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": tname}}
+                      for tid, tname in self.threads.items()]
+            for name, start, dur, tid, args in self.spans or []:
+                events.append({"name": name, "ph": "X", "pid": pid, "tid": tid,
+                               "ts": round((start - self.t0) * 1e6, 1), "dur": round(dur * 1e6, 1),
+                               "args": args or {}})
+            data = {"traceEvents": events, "otherData": {"counters": dict(self.counters)}}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False)
+
+class PageTextIndex:
+    """On-disk store of normalized page text keyed by file path, page, mtime and size.
+
+    Files are re-extracted only when their mtime/size (or the OCR settings used to
+    read them) change. An FTS5 trigram table is kept alongside when the bundled
+    SQLite supports it, so exact (100%) searches become index lookups, and a
+    page_keys table maps every phonetic word key to the pages containing it.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, ocr_key TEXT);
+            CREATE TABLE IF NOT EXISTS pages (path TEXT, page INTEGER, mode TEXT, text TEXT, PRIMARY KEY (path, page));
+            CREATE TABLE IF NOT EXISTS page_keys (key TEXT, path TEXT, page INTEGER, PRIMARY KEY (key, path, page)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS page_keys_path ON page_keys (path);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.has_fts = self._create_fts()
+        self._check_phonetic_keys()
+
+    def _create_fts(self):
+        try:
+            self.db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(text, content='pages', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+                    INSERT INTO pages_fts(rowid, text) VALUES (new.rowid, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+                    INSERT INTO pages_fts(pages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                END;
+            """)
+            return True
+        except sqlite3.OperationalError:
+            # SQLite without FTS5 / trigram tokenizer: plain page table only
+            return False
+
+    def _check_phonetic_keys(self):
+        # keys are derived from the stored text: rebuild them (no re-OCR) for indexes
+        # written before page_keys existed or by another key algorithm
+        row = self.db.execute("SELECT value FROM meta WHERE name='phonetic_version'").fetchone()
+        if row is not None and row[0] == str(PHONETIC_VERSION):
+            return
+        with self.db:
+            self.db.execute("DELETE FROM page_keys")
+            for path, page, text in self.db.execute("SELECT path, page, text FROM pages").fetchall():
+                self._insert_keys(path, page, text)
+            self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('phonetic_version', ?)",
+                            (str(PHONETIC_VERSION),))
+
+    def _insert_keys(self, path, page, text):
+        self.db.executemany("INSERT OR IGNORE INTO page_keys (key, path, page) VALUES (?, ?, ?)",
+                            [(k, path, page) for k in phonetic_keys(text or "")])
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_current(self, path, ocr_key):
+        st = os.stat(path)
+        row = self.db.execute("SELECT mtime, size, ocr_key FROM files WHERE path=?", (path,)).fetchone()
+        return row is not None and row[0] == st.st_mtime and row[1] == st.st_size and row[2] == ocr_key
+
+    def replace_file(self, path, pages, ocr_key):
+        st = os.stat(path)
+        with self.db:
+            self.db.execute("DELETE FROM pages WHERE path=?", (path,))
+            self.db.execute("DELETE FROM page_keys WHERE path=?", (path,))
+            pages = [(path, page_no or 0, mode, text) for page_no, text, mode in pages]
+            self.db.executemany("INSERT INTO pages (path, page, mode, text) VALUES (?, ?, ?, ?)", pages)
+            for _, page, _, text in pages:
+                self._insert_keys(path, page, text)
+            self.db.execute("INSERT OR REPLACE INTO files (path, mtime, size, ocr_key) VALUES (?, ?, ?, ?)",
+                            (path, st.st_mtime, st.st_size, ocr_key))
+
+    def remove_file(self, path):
+        with self.db:
+            self.db.execute("DELETE FROM pages WHERE path=?", (path,))
+            self.db.execute("DELETE FROM page_keys WHERE path=?", (path,))
+            self.db.execute("DELETE FROM files WHERE path=?", (path,))
+
+    def prune(self, folder, keep_paths):
+        # forget files under `folder` that were deleted or renamed since the last run
+        prefix = os.path.join(os.path.abspath(folder), "")
+        keep = set(keep_paths)
+        gone = [p for (p,) in self.db.execute("SELECT path FROM files") if p.startswith(prefix) and p not in keep]
+        for p in gone:
+            self.remove_file(p)
+        return len(gone)
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM pages")
+            self.db.execute("DELETE FROM page_keys")
+            self.db.execute("DELETE FROM files")
+
+    def phonetic_pages(self, key_groups):
+        """{path: {page}} of pages that hold every key of at least one group (one group per keyword)."""
+        found = {}
+        for keys in key_groups:
+            if not keys:
+                continue
+            rows = self.db.execute(
+                "SELECT path, page FROM page_keys WHERE key IN (%s) GROUP BY path, page HAVING COUNT(*) = ?"
+                % ",".join("?" * len(keys)), (*keys, len(keys)))
+            for path, page in rows:
+                found.setdefault(path, set()).add(page)
+        return found
+
+    def iter_pages(self, path, terms=None, pages=None):
+        """Yield (page_no, text, mode) for `path`; with `terms`, only pages containing
+        one of them; with `pages`, only those page numbers."""
+        if terms and any(len(t) < 3 for t in terms):
+            terms = None  # the trigram index cannot look up a 1-2 character term: read every page
+        if pages is not None:
+            rows = self.db.execute("SELECT page, text, mode FROM pages WHERE path=? AND page IN (%s) ORDER BY page"
+                                   % ",".join("?" * len(pages)), (path, *sorted(pages)))
+        elif terms and self.has_fts:
+            query = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+            rows = self.db.execute(
+                "SELECT p.page, p.text, p.mode FROM pages_fts JOIN pages p ON p.rowid = pages_fts.rowid "
+                "WHERE pages_fts MATCH ? AND p.path=? ORDER BY p.page", (query, path))
+        else:
+            rows = self.db.execute("SELECT page, text, mode FROM pages WHERE path=? ORDER BY page", (path,))
+        for page_no, text, mode in rows:
+            yield (page_no or None), text, mode
+
+@functools.lru_cache(maxsize=None)
+def tesseract_version(tesseract_cmd):
+    try:
+        res = subprocess.run([tesseract_cmd or "tesseract", "--version"], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace",
+                             creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        lines = res.stdout.strip().splitlines()
+        return lines[0].strip() if lines else "unknown"
+    except Exception:
+        return "unknown"
+
+def image_digest(img):
+    h = hashlib.sha1(f"{img.mode}:{img.size}:".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+def ocr_cache_key(content_digest, kind, lang, dpi, tesseract_cmd):
+    # same pixels + same OCR settings + same engine build => same result
+    raw = "|".join([content_digest, kind, lang, str(dpi), tesseract_version(tesseract_cmd)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class OcrCache:
+    """Content-addressed OCR results (text or per-page PDF) with size-bounded LRU eviction.
+
+    Shared by the Convert and Search flows; safe to call from pool workers.
+    """
+
+    def __init__(self, db_path=DEFAULT_OCR_CACHE_PATH, max_mb=DEFAULT_OCR_CACHE_MB):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.touched = {}  # key -> last_used of hits not yet written back (see _flush_touched)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL + synchronous=NORMAL: a commit is an append to the log, not an fsync of the database
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS ocr (key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_used REAL);
+            CREATE INDEX IF NOT EXISTS ocr_lru ON ocr (last_used);
+        """)
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM ocr").fetchone()[0]
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM ocr WHERE key=?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            # the LRU stamp is only needed for eviction: keep it in memory until the next write
+            self.touched[key] = time.time()
+            if len(self.touched) >= 256:
+                with self.db:
+                    self._flush_touched()
+            self.hits += 1
+            return bytes(row[0])
+
+    def _flush_touched(self):
+        if self.touched:
+            self.db.executemany("UPDATE ocr SET last_used=? WHERE key=?",
+                                [(t, k) for k, t in self.touched.items()])
+            self.touched.clear()
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock, self.db:
+            self._flush_touched()
+            old = self.db.execute("SELECT size FROM ocr WHERE key=?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO ocr (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                            (key, value, len(value), time.time()))
+            self.total_bytes += len(value) - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # drop least recently used entries until we are back under budget
+        victims = []
+        for key, size in self.db.execute("SELECT key, size FROM ocr ORDER BY last_used"):
+            if self.total_bytes <= self.max_bytes:
+                break
+            victims.append((key,))
+            self.total_bytes -= size
+        self.db.executemany("DELETE FROM ocr WHERE key=?", victims)
+
+    def counters(self):
+        with self.lock:
+            return self.hits, self.misses
+
+    def clear(self):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM ocr")
+            self.touched.clear()
+            self.total_bytes = 0
+
+    def close(self):
+        with self.lock:
+            with self.db:
+                self._flush_touched()
+            self.db.close()
+
+class ConvertManifest:
+    """Per-file / per-page state of conversion runs, kept next to the outputs.
+
+    SQLite gives atomic updates, so a crash or closed window leaves every row at
+    its last checkpoint: status is 'partial' (with pages_done and a .part output),
+    'done' or 'failed'.
+    """
+
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS files (
+            src TEXT PRIMARY KEY, mtime REAL, size INTEGER, ocr_key TEXT, pages INTEGER,
+            pages_done INTEGER, status TEXT, output TEXT, error TEXT, updated REAL)""")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def get(self, src):
+        cur = self.db.execute("SELECT * FROM files WHERE src=?", (src,))
+        row = cur.fetchone()
+        return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+    def update(self, src, **fields):
+        fields["updated"] = time.time()
+        with self.db:
+            self.db.execute("INSERT OR IGNORE INTO files (src) VALUES (?)", (src,))
+            self.db.execute(f"UPDATE files SET {', '.join(k + '=?' for k in fields)} WHERE src=?",
+                            list(fields.values()) + [src])
+
+    @staticmethod
+    def fingerprint(path):
+        st = os.stat(path)
+        return {"mtime": st.st_mtime, "size": st.st_size}
+
+    def is_unchanged(self, entry, src, ocr_key):
+        if entry is None or entry["ocr_key"] != ocr_key:
+            return False
+        fp = self.fingerprint(src)
+        return entry["mtime"] == fp["mtime"] and entry["size"] == fp["size"]
+
+class ResultStore:
+    """Append-only list of result records for the GUI table and exports.
+
+    Records stay in memory until they exceed `memory_mb`; everything after that
+    spills to a temporary SQLite file. rows(start, count) serves one table page.
+    """
+
+    def __init__(self, columns=RESULT_COLUMNS, memory_mb=DEFAULT_RESULTS_MEMORY_MB):
+        self.columns = list(columns)
+        self.budget = int(memory_mb * 1024 * 1024)
+        self.lock = threading.RLock()
+        self.mem = []
+        self.mem_bytes = 0
+        self.db = None
+        self.db_path = None
+        self.disk_count = 0
+        self.buffer = []
+
+    def __len__(self):
+        with self.lock:
+            return len(self.mem) + self.disk_count
+
+    @property
+    def spilled(self):
+        return self.db is not None
+
+    def append(self, rec):
+        with self.lock:
+            if self.db is None:
+                # rough in-memory footprint of a dict of short str (UCS-2/4) values
+                size = 240 + sum(2 * len(str(v)) + 64 for v in rec.values())
+                if self.mem_bytes + size <= self.budget:
+                    self.mem.append(rec)
+                    self.mem_bytes += size
+                    return
+                self._open_spill()
+            self.buffer.append((json.dumps([rec.get(c, "") for c in self.columns], ensure_ascii=False),))
+            self.disk_count += 1
+            if len(self.buffer) >= 1000:
+                self._flush()
+
+    def _open_spill(self):
+        fd, self.db_path = tempfile.mkstemp(prefix="gujarati_results_", suffix=".sqlite3")
+        os.close(fd)
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY, data TEXT)")
+
+    def _flush(self):
+        if self.buffer:
+            with self.db:
+                self.db.executemany("INSERT INTO rows (data) VALUES (?)", self.buffer)
+            self.buffer = []
+
+    def rows(self, start, count):
+        with self.lock:
+            out = self.mem[start:start + count]
+            if len(out) < count and self.db is not None:
+                self._flush()
+                # disk row i (0-based) has id i + 1
+                disk_start = max(0, start - len(self.mem))
+                for (data,) in self.db.execute("SELECT data FROM rows WHERE id > ? ORDER BY id LIMIT ?",
+                                               (disk_start, count - len(out))):
+                    out.append(dict(zip(self.columns, json.loads(data))))
+            return out
+
+    def __iter__(self, chunk=5000):
+        start = 0
+        while True:
+            rows = self.rows(start, chunk)
+            if not rows:
+                return
+            yield from rows
+            start += len(rows)
+
+    def clear(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                try:
+                    os.remove(self.db_path)
+                except OSError:
+                    pass
+            self.mem = []
+            self.mem_bytes = 0
+            self.db = None
+            self.db_path = None
+            self.disk_count = 0
+            self.buffer = []
+
+    close = clear
+
+# -----------------------------
+# Export (streaming, constant memory)
+# -----------------------------
+EXPORT_CHUNK_ROWS = 5000
+XLSX_MAX_ROWS = 1048576  # Excel's row limit per sheet, header included
+EXPORT_FORMATS = {".csv": "csv", ".xlsx": "xlsx", ".parquet": "parquet"}
+
+class CsvExport:
+    def __init__(self, path, columns):
+        # utf-8-sig so Excel opens the Gujarati text correctly
+        self.fh = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.fh, fieldnames=columns, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.fh.close()
+
+class XlsxExport:
+    """openpyxl write-only workbook: rows go straight to a temp file, not an in-memory
+    sheet. Past Excel's row limit the rows continue on "Results 2", "Results 3", ..."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheets += 1
+        self.ws = self.wb.create_sheet("Results" if self.sheets == 1 else f"Results {self.sheets}")
+        self.ws.append(self.columns)
+        self.sheet_rows = 1
+
+    def write(self, rows):
+        for rec in rows:
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            # control characters are not allowed in XLSX cells
+            self.ws.append([openpyxl_cell.ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v
+                            for v in (rec.get(c) for c in self.columns)])
+            self.sheet_rows += 1
+
+    def close(self):
+        self.wb.save(self.path)
+
+class ParquetExport:
+    """Parquet row groups of one chunk each; column types come from the first chunk
+    (a column that is empty there is written as text)."""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, rows):
+        data = {c: [None if rec.get(c) == "" else rec.get(c) for rec in rows] for c in self.columns}
+        if self.writer is None:
+            table = pa.table(data)
+            schema = pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                                for f in table.schema])
+            self.writer = pq.ParquetWriter(self.path, schema, compression="zstd")
+        for f in self.writer.schema:
+            if pa.types.is_string(f.type):
+                data[f.name] = [None if v is None else str(v) for v in data[f.name]]
+        self.writer.write_table(pa.table(data, schema=self.writer.schema))
+
+    def close(self):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, pa.schema([(c, pa.string()) for c in self.columns]))
+        self.writer.close()
+
+EXPORT_WRITERS = {"csv": CsvExport, "xlsx": XlsxExport, "parquet": ParquetExport}
+
+def export_rows(rows, path, columns, total=None, progress=None, chunk=EXPORT_CHUNK_ROWS):
+    """Write dict `rows` to `path` as CSV, XLSX or Parquet (by extension), `chunk` rows
+    at a time, so memory stays flat however many rows there are. The file appears
+    only once complete; `progress(done, total, text)` runs after every chunk.
+    Returns the number of rows written."""
+    fmt = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise EngineError(f"Cannot export to '{os.path.basename(path)}': use .csv, .xlsx or .parquet.")
+    if fmt == "parquet" and not module_available(pq):
+        raise EngineError("Parquet export needs pyarrow (pip install pyarrow).")
+    progress = progress or (lambda done, total, text=None: None)
+    tmp = path + ".part"
+    done = 0
+    writer = None
+    try:
+        writer = EXPORT_WRITERS[fmt](tmp, list(columns))
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, chunk))
+            if not batch:
+                break
+            writer.write(batch)
+            done += len(batch)
+            of = f" of {total:,}" if total else ""
+            progress(done, total or done, f"Exporting {os.path.basename(path)}: {done:,}{of} rows")
+        writer.close()
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            if writer is not None:
+                writer.close()  # release the handle so the partial file can go
+        except Exception:
+            pass
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return done
+
+# -----------------------------
+# Page preprocessing (before OCR)
+# -----------------------------
+def ink_mask(gray, window=0, k=0.15):
+    """True where a pixel is darker than its neighbourhood mean (Bradley threshold),
+    so faint or unevenly lit scans binarize as well as clean ones."""
+    h, w = gray.shape
+    r = (window or max(15, min(h, w) // 40)) // 2
+    # window sums one axis at a time, in int32 whenever the largest product fits:
+    # a full-page temporary then costs 4 bytes a pixel instead of 8
+    dt = np.int32 if 255 * 100 * (2 * r + 1) ** 2 < 2 ** 31 else np.int64
+    y0 = np.clip(np.arange(h) - r, 0, h)
+    y1 = np.clip(np.arange(h) + r + 1, 0, h)
+    x0 = np.clip(np.arange(w) - r, 0, w)
+    x1 = np.clip(np.arange(w) + r + 1, 0, w)
+    acc = np.zeros((h + 1, w), dt)
+    np.cumsum(gray, 0, dtype=dt, out=acc[1:])
+    band = acc[y1]
+    band -= acc[y0]
+    acc = np.zeros((h, w + 1), dt)
+    np.cumsum(band, 1, dtype=dt, out=acc[:, 1:])
+    del band
+    total = acc[:, x1]
+    total -= acc[:, x0]
+    del acc
+    total *= int(100 * (1 - k))
+    scaled = gray.astype(dt)
+    scaled *= 100
+    scaled *= (y1 - y0).astype(dt)[:, None]
+    scaled *= (x1 - x0).astype(dt)[None, :]
+    return scaled < total
+
+def _runs(mask):
+    """(start, end) of every run of True in a 1-d bool array."""
+    d = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(d == 1), np.flatnonzero(d == -1)
+
+def estimate_skew(ink, max_deg=MAX_SKEW_DEG, step=0.25):
+    """Rotation (degrees, counter-clockwise like PIL's rotate) that straightens the text
+    rows: the shear that makes the row ink profile sharpest. 0.0 if unsure."""
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 500:
+        return 0.0
+    if len(ys) > 200000:
+        keep = slice(None, None, len(ys) // 200000 + 1)
+        ys, xs = ys[keep], xs[keep]
+    best, best_score = 0.0, None
+    for angle in np.arange(-max_deg, max_deg + step / 2, step):
+        yy = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+        hist = np.bincount(yy - yy.min())
+        score = int(np.dot(hist, hist))
+        if best_score is None or score > best_score:
+            best, best_score = float(angle), score
+    return -best if abs(best) >= step else 0.0
+
+def estimate_line_height(ink):
+    """Median text line height in pixels from the row ink profile, None if the page has too few lines."""
+    rows = ink.sum(1)
+    lo, hi = np.percentile(rows, [10, 90])
+    if hi <= lo:
+        return None
+    # card borders put a little ink in every row; text rows carry much more
+    starts, ends = _runs(rows > lo + 0.15 * (hi - lo))
+    heights = (ends - starts)[(ends - starts) >= 3]
+    return float(np.median(heights)) if len(heights) >= 5 else None
+
+def ink_box(ink, min_count=2):
+    rows = np.flatnonzero(ink.sum(1) >= min_count)
+    cols = np.flatnonzero(ink.sum(0) >= min_count)
+    if not len(rows) or not len(cols):
+        return None
+    pad = max(ink.shape) // 100
+    h, w = ink.shape
+    return (max(cols[0] - pad, 0), max(rows[0] - pad, 0), min(cols[-1] + pad + 1, w), min(rows[-1] + pad + 1, h))
+
+def column_cuts(ink, min_width=0.15):
+    """x positions of the white gutters between voter-card columns (a spanning
+    header line may cross them); every column is at least `min_width` of the page."""
+    h, w = ink.shape
+    starts, ends = _runs(ink.sum(0) <= max(1, h // 100))
+    cuts, last = [], 0
+    for a, b in zip(starts, ends):
+        if a == 0 or b == w or b - a < max(3, w // 200):
+            continue
+        cut = (a + b) // 2
+        if cut - last >= min_width * w and w - cut >= min_width * w:
+            cuts.append(cut)
+            last = cut
+    return cuts
+
+def plan_page(gray, max_dpi, min_dpi=0, deskew=True, split=False):
+    """Decide how to rasterize a page from its PROBE_DPI grayscale render.
+
+    Returns {"dpi", "angle", "box", "columns"}: the lowest DPI (multiple of 25, in
+    [min_dpi, max_dpi]) that gives TARGET_LINE_PX text lines, the deskew angle, and
+    for split=True the ink box and column cuts in inches (of the deskewed page).
+    """
+    plan = {"dpi": max_dpi, "angle": 0.0, "box": None, "columns": []}
+    ink = ink_mask(gray)
+    if deskew:
+        plan["angle"] = estimate_skew(ink)
+        if plan["angle"]:
+            gray = np.asarray(Image.fromarray(gray).rotate(plan["angle"], resample=Image.BILINEAR, fillcolor=255))
+            ink = ink_mask(gray)
+    if min_dpi:
+        line = estimate_line_height(ink)
+        if line:
+            dpi = int(round(TARGET_LINE_PX * PROBE_DPI / line / 25.0)) * 25
+            plan["dpi"] = min(max_dpi, max(min_dpi, dpi))
+    if split:
+        box = ink_box(ink)
+        if box:
+            x0, y0, x1, y1 = box
+            plan["box"] = tuple(float(v) / PROBE_DPI for v in box)
+            plan["columns"] = [float(x0 + c) / PROBE_DPI for c in column_cuts(ink[y0:y1, x0:x1])]
+    return plan
+
+def preprocess_image(img, plan, mode="gray", split=False):
+    """Apply a plan_page() plan to the page rendered at plan["dpi"]: deskew,
+    binarize (mode "binary") and, with split, crop to the ink box and cut it
+    into column regions. Returns a list of PIL images in reading order."""
+    if plan["angle"]:
+        img = img.rotate(plan["angle"], resample=Image.BILINEAR, fillcolor="white")
+    if mode == "binary":
+        gray = np.asarray(img.convert("L"))
+        img = Image.fromarray(~ink_mask(gray, window=max(15, plan["dpi"] // 8)))
+    if not split or not plan["box"]:
+        return [img]
+    scale = plan["dpi"]
+    x0, y0, x1, y1 = (int(round(v * scale)) for v in plan["box"])
+    edges = [x0] + [int(round(c * scale)) for c in plan["columns"]] + [x1]
+    return [img.crop((a, y0, b, y1)) for a, b in zip(edges, edges[1:])]
+
+def overlay_text_layer(page, text_pdf, angle=0.0):
+    """Lay Tesseract's text-only PDF page (OCR of the page rendered, and rotated by
+    `angle` when deskewed) over `page`, turned back so the words sit on their ink."""
+    rect = page.rect
+    if angle:
+        # show_pdf_page fits the rotated page into `rect`: size `rect` to its bounding box so the scale stays 1
+        a = math.radians(abs(angle))
+        w = rect.width * math.cos(a) + rect.height * math.sin(a)
+        h = rect.width * math.sin(a) + rect.height * math.cos(a)
+        c = (rect.tl + rect.br) / 2
+        rect = fitz.Rect(c.x - w / 2, c.y - h / 2, c.x + w / 2, c.y + h / 2)
+    page.show_pdf_page(rect, text_pdf, 0, rotate=-angle)
+
+# -----------------------------
+# Voter records (structured card fields + Parquet store)
+# -----------------------------
+# bump when page_card_lines / parse_voter_cards change; stale record files are re-parsed
+RECORDS_VERSION = 1
+EPIC_RE = re.compile(r"\b([A-Z]{3}[0-9]{7}|[A-Z]{2}/[0-9]{2}/[0-9]{3}/[0-9]{6,7})\b")
+SERIAL_RE = re.compile(r"^([0-9૦-૯]{1,5})(?:\s|$)")
+LABEL_RE = re.compile(r"^([^:：]{1,40}?)\s*[:：]\s*(.*)$")
+AGE_RE = re.compile(r"(?:ઉંમર|ઉમર|વય|Age)\s*[:：.]?\s*([0-9૦-૯]{1,3})", re.I)
+GENDER_RE = re.compile(r"(?:જાતિ|જાતી|લિંગ|Gender|Sex)\s*[:：.]?\s*([^\s:：]+)", re.I)
+HOUSE_RE = re.compile(r"(?:ઘર|મકાન|House)\s*(?:નંબર|નં\.?|No\.?|Number)?\s*[:：]\s*([^\s:：]+)", re.I)
+# "વોડ": text layers with broken ToUnicode maps drop conjuncts such as ર્ડ
+WARD_RE = re.compile(r"(?:વોર્ડ|વૉર્ડ|વોડ|Ward)\s*(?:નંબર|નં\.?|No\.?)?\s*[:：]?\s*([0-9૦-૯]+)", re.I)
+PART_RE = re.compile(r"(?:ભાગ|Part)\s*(?:નંબર|નં\.?|No\.?)?\s*[:：]?\s*([0-9૦-૯]+)", re.I)
+CONTROL_RE = re.compile(r"[\x00-\x1f\x7f-\x9f]")
+GUJ_DIGITS = str.maketrans({chr(0x0AE6 + d): str(d) for d in range(10)})
+NAME_LABELS = {"નામ", "મતદારનુંનામ", "name", "electorsname", "nameofelector"}
+# label prefixes of the relative's name; the pre-base i-matra is often lost from
+# text layers, so "પિતાનું" may come out as "પતાનું" and "પતિનું" as "પતનું"
+RELATION_LABELS = [("પિતા", "father"), ("પતા", "father"), ("પતિ", "husband"), ("પતનું", "husband"),
+                   ("માતા", "mother"), ("father", "father"), ("husband", "husband"), ("mother", "mother")]
+RECORD_COLUMNS = ["path", "page", "ward", "part", "serial", "epic", "name", "surname", "relation",
+                  "relative_name", "house_no", "age", "gender"]
+
+def _label_key(label):
+    guj = re.sub(r"[^\u0A80-\u0AFF]", "", label)
+    return guj or re.sub(r"[^a-z]", "", label.lower())
+
+def gender_code(value):
+    """"M" / "F" / "O" for a gender field value in Gujarati or English, "" if unreadable."""
+    v = re.sub(r"[^\u0A80-\u0AFFA-Za-z]", "", value or "").lower()
+    if v.startswith(("પુ", "m")):
+        return "M"
+    # "સ્ત્રી" with a garbled conjunct still ends in its ii-matra
+    if v.startswith(("સ્ત", "સ્ર", "મહિ", "f", "w")) or v.endswith("ી"):
+        return "F"
+    if v.startswith(("ત્રી", "અન્ય", "t", "o")):
+        return "O"
+    return ""
+
+def parse_age_range(spec):
+    """(min, max) from "35", "30-40", "60-" or "-25"; None for an open end."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None, None
+    lo, sep, hi = spec.partition("-")
+    try:
+        lo = int(lo) if lo.strip() else None
+        hi = (int(hi) if hi.strip() else None) if sep else lo
+    except ValueError:
+        raise EngineError(f"Invalid age '{spec}', expected e.g. 35 or 30-40.")
+    return lo, hi
+
+def roll_header(lines, ward="", part=""):
+    """(ward, part) from a page's header lines; a page without a header keeps the previous page's."""
+    for line in lines:
+        m = WARD_RE.search(line)
+        if m:
+            ward = m.group(1).translate(GUJ_DIGITS)
+        m = PART_RE.search(line)
+        if m:
+            part = m.group(1).translate(GUJ_DIGITS)
+    return ward, part
+
+def _finish_card(card):
+    words = card["name"].split()
+    surname = words[-1] if words else ""
+    card["surname"] = surname
+    card["surname_fold"] = fold_gujarati(surname)
+    card["surname_key"] = phonetic_key(surname)
+    return card
+
+def parse_voter_cards(lines):
+    """Voter cards in `lines` (one page, card reading order) as dicts of the fields
+    they carry. A card starts at its serial / EPIC line, or at a second name line."""
+    cards = []
+    card = {}
+    for line in lines:
+        line = normalize_text(line)
+        if not line:
+            continue
+        epic = EPIC_RE.search(line)
+        serial = SERIAL_RE.match(line)
+        if epic or (serial and serial.group(0).strip() == line):
+            if card.get("name"):
+                cards.append(_finish_card(card))
+            if card.get("name") or card.get("epic"):
+                card = {}
+            if epic:
+                card["epic"] = epic.group(1)
+            if serial and (not epic or serial.end() <= epic.start()):
+                card["serial"] = int(serial.group(1).translate(GUJ_DIGITS))
+            continue
+        m = LABEL_RE.match(line)
+        if m and _label_key(m.group(1)).endswith(("નામ", "name")):
+            value = m.group(2)
+            for rx in (HOUSE_RE, AGE_RE, GENDER_RE):  # another field on the same line
+                f = rx.search(value)
+                if f:
+                    value = value[:f.start()]
+            value = value.strip()
+            key = _label_key(m.group(1))
+            if key in NAME_LABELS:
+                if card.get("name"):
+                    cards.append(_finish_card(card))
+                    card = {}
+                card["name"] = value
+            else:
+                card["relative_name"] = value
+                card["relation"] = next((r for p, r in RELATION_LABELS if key.startswith(p)), "other")
+        f = HOUSE_RE.search(line)
+        if f:
+            card["house_no"] = f.group(1).translate(GUJ_DIGITS)
+        f = AGE_RE.search(line)
+        if f:
+            card["age"] = int(f.group(1).translate(GUJ_DIGITS))
+            g = GENDER_RE.search(line, f.end())
+            # garbled gender label: the field value is still the last word of the age line
+            tail = line[f.end():].split()
+            card["gender"] = gender_code(g.group(1) if g else (tail[-1] if tail else ""))
+        elif GENDER_RE.search(line):
+            card["gender"] = gender_code(GENDER_RE.search(line).group(1))
+    if card.get("name"):
+        cards.append(_finish_card(card))
+    return cards
+
+def page_card_lines(page):
+    """Text lines of a text-layer page in card reading order. Lines are rebuilt from
+    the word boxes, cut into columns at the gutters between voter cards and read one
+    column at a time, top to bottom (get_text("text") may interleave a grid row)."""
+    lines = {}
+    for x0, y0, x1, y1, word, block, line, _ in page.get_text("words"):
+        lines.setdefault((block, line), []).append((x0, y0, x1, y1, word))
+    boxes = []
+    for words in lines.values():
+        words.sort()
+        boxes.append((min(w[0] for w in words), min(w[1] for w in words), max(w[2] for w in words),
+                      max(w[3] for w in words), " ".join(w[4] for w in words)))
+    if not boxes:
+        return []
+    w, h = int(page.rect.width) + 1, int(page.rect.height) + 1
+    cover = np.zeros((h, w), bool)
+    for x0, y0, x1, y1, _ in boxes:
+        if x1 - x0 < 0.6 * w:  # a page-wide header would bridge every gutter
+            cover[max(0, int(y0)):int(y1) + 1, max(0, int(x0)):int(x1) + 1] = True
+    cuts = column_cuts(cover)
+    rows = sorted((bisect.bisect(cuts, x0 + 1), (y0 + y1) / 2, x0, y1 - y0, text) for x0, y0, x1, y1, text in boxes)
+    # words of one card line that PyMuPDF reports as separate lines (e.g. age / gender) are joined
+    out, last = [], None
+    for col, ymid, x0, height, text in rows:
+        if last and last[0] == col and abs(ymid - last[1]) < 0.5 * max(height, last[2]):
+            last[3].append((x0, text))
+            continue
+        last = [col, ymid, height, [(x0, text)]]
+        out.append(last)
+    # control characters stand in for conjuncts a broken ToUnicode map could not name
+    return [CONTROL_RE.sub("", " ".join(t for _, t in sorted(parts))) for _, _, _, parts in out]
+
+@functools.lru_cache(maxsize=1)
+def record_schema():
+    return pa.schema([
+        ("path", pa.string()), ("page", pa.int32()), ("ward", pa.string()), ("part", pa.string()),
+        ("serial", pa.int32()), ("epic", pa.string()), ("name", pa.string()), ("surname", pa.string()),
+        ("relation", pa.string()), ("relative_name", pa.string()), ("house_no", pa.string()),
+        ("age", pa.int16()), ("gender", pa.string()),
+        # query helpers: folded surname for exact, phonetic key for variant matches
+        ("surname_fold", pa.string()), ("surname_key", pa.string()),
+    ])
+
+class RecordStore:
+    """Voter records as one Parquet file per source roll (see record_schema).
+
+    Every file carries its source's path, mtime, size and extraction key in the
+    Parquet metadata, so only new or changed rolls are re-parsed. Queries load the
+    columns once (cached until a file changes) and filter them with Arrow compute
+    kernels, so a filter over millions of rows takes milliseconds.
+    """
+
+    _tables = {}  # root -> (signature, pyarrow.Table), shared by every store on that folder
+    _tables_lock = threading.Lock()
+
+    def __init__(self, root=DEFAULT_RECORDS_DIR):
+        if not module_available(pq):
+            raise EngineError("Voter records need pyarrow (pip install pyarrow).")
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def file_for(self, path):
+        return os.path.join(self.root, hashlib.sha1(path.encode("utf-8")).hexdigest()[:20] + ".parquet")
+
+    def _files(self):
+        return sorted(os.path.join(self.root, f) for f in os.listdir(self.root) if f.endswith(".parquet"))
+
+    @staticmethod
+    def source(fn):
+        """Source fingerprint stored in a record file, None if unreadable."""
+        try:
+            meta = pq.read_schema(fn).metadata or {}
+            return json.loads(meta[b"gujarati_source"])
+        except (OSError, KeyError, ValueError, pa.ArrowException):
+            return None
+
+    def is_current(self, path, key):
+        st = os.stat(path)
+        src = self.source(self.file_for(path))
+        return (src is not None and src.get("path") == path and src.get("mtime") == st.st_mtime
+                and src.get("size") == st.st_size and src.get("key") == key)
+
+    def write_file(self, path, records, key):
+        st = os.stat(path)
+        schema = record_schema().with_metadata({"gujarati_source": json.dumps(
+            {"path": path, "mtime": st.st_mtime, "size": st.st_size, "key": key}, ensure_ascii=False)})
+        table = pa.Table.from_pylist(records, schema=schema)
+        fn = self.file_for(path)
+        pq.write_table(table, fn + ".tmp", compression="zstd")
+        os.replace(fn + ".tmp", fn)
+
+    def prune(self, folder, keep_paths):
+        # drop records of rolls under `folder` that were deleted or renamed
+        prefix = os.path.join(os.path.abspath(folder), "")
+        keep = set(keep_paths)
+        gone = 0
+        for fn in self._files():
+            src = self.source(fn)
+            if src is None or (src["path"].startswith(prefix) and src["path"] not in keep):
+                os.remove(fn)
+                gone += 1
+        return gone
+
+    def clear(self):
+        for fn in self._files():
+            os.remove(fn)
+
+    def table(self):
+        """All records as one pyarrow Table."""
+        files = self._files()
+        sig = tuple((fn, os.stat(fn).st_mtime_ns) for fn in files)
+        with self._tables_lock:
+            cached = self._tables.get(self.root)
+            if cached and cached[0] == sig:
+                return cached[1]
+            tables = [pq.read_table(fn, schema=record_schema()) for fn in files]
+            # one contiguous chunk per column: filters and to_pandas stay vectorized
+            table = pa.concat_tables(tables).combine_chunks() if tables else record_schema().empty_table()
+            self._tables[self.root] = (sig, table)
+            return table
+
+    def query(self, surname="", name="", age_min=None, age_max=None, ward="", part="", gender="",
+              phonetic=False, folder=""):
+        """DataFrame (RECORD_COLUMNS) of the records matching every given filter.
+
+        `surname` matches the last word of the name exactly (after folding spelling
+        variants) or, with `phonetic`, by phonetic key; `name` is a substring.
+        """
+        table = self.table()
+        mask = pa.array(np.ones(table.num_rows, bool))
+        if folder:
+            mask = pc.and_(mask, pc.starts_with(table["path"], os.path.join(os.path.abspath(folder), "")))
+        if surname:
+            if phonetic:
+                mask = pc.and_(mask, pc.equal(table["surname_key"], phonetic_key(surname.strip())))
+            else:
+                mask = pc.and_(mask, pc.equal(table["surname_fold"], fold_gujarati(surname.strip())))
+        if name:
+            mask = pc.and_(mask, pc.match_substring(table["name"], normalize_text(name)))
+        if age_min is not None:
+            mask = pc.and_(mask, pc.greater_equal(table["age"], int(age_min)))
+        if age_max is not None:
+            mask = pc.and_(mask, pc.less_equal(table["age"], int(age_max)))
+        if ward:
+            mask = pc.and_(mask, pc.equal(table["ward"], str(ward).strip().translate(GUJ_DIGITS)))
+        if part:
+            mask = pc.and_(mask, pc.equal(table["part"], str(part).strip().translate(GUJ_DIGITS)))
+        if gender:
+            mask = pc.and_(mask, pc.equal(table["gender"], gender_code(gender) or gender.strip().upper()))
+        # nulls (e.g. a card without an age) never match a filter on that field
+        return table.filter(pc.fill_null(mask, False)).select(RECORD_COLUMNS).to_pandas(integer_object_nulls=True)
+
+# -----------------------------
+# Settings (shared with the GUI Settings tab)
+# -----------------------------
+class EngineError(Exception):
+    """Invalid input folders, terms or settings; the message is shown to the user as is."""
+
+def load_settings(path=DEFAULT_SETTINGS_PATH):
+    """DEFAULT_SETTINGS overlaid with the saved file (a missing / unreadable file is ignored).
+
+    Saved values must have the type of their default; EngineError names the first bad one.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            saved = json.load(fh)
+    except (OSError, ValueError):
+        return settings
+    if not isinstance(saved, dict):
+        raise EngineError(f"Settings file {path} is not a JSON object.")
+    for k, v in saved.items():
+        if k in DEFAULT_SETTINGS:
+            settings[k] = check_setting(k, v, path)
+    return settings
+
+def check_setting(name, value, path=""):
+    """`value` converted to the type of DEFAULT_SETTINGS[name], or EngineError."""
+    default = DEFAULT_SETTINGS[name]
+    where = f" in {path}" if path else ""
+    if isinstance(default, bool):
+        if not isinstance(value, bool):
+            raise EngineError(f"Setting '{name}'{where} must be true or false, not {value!r}.")
+        return value
+    if isinstance(default, int):
+        try:
+            if isinstance(value, bool):
+                raise ValueError(value)
+            return int(value)
+        except (TypeError, ValueError):
+            raise EngineError(f"Setting '{name}'{where} must be a whole number, not {value!r}.") from None
+    if not isinstance(value, str):
+        raise EngineError(f"Setting '{name}'{where} must be text, not {value!r}.")
+    if name == "ocr_image" and value not in ("color", "gray", "binary"):
+        raise EngineError(f"Setting 'ocr_image'{where} must be color, gray or binary, not {value!r}.")
+    return value
+
+def save_settings(settings, path=DEFAULT_SETTINGS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({k: settings.get(k, v) for k, v in DEFAULT_SETTINGS.items()}, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+_ocr_caches = {}
+_ocr_caches_lock = threading.Lock()
+
+def shared_ocr_cache(settings):
+    """Process-wide OcrCache for the configured size, or None when caching is off."""
+    max_mb = int(settings.get("ocr_cache_mb") or 0)
+    if max_mb <= 0:
+        return None
+    with _ocr_caches_lock:
+        cache = _ocr_caches.get(DEFAULT_OCR_CACHE_PATH)
+        if cache is None:
+            cache = _ocr_caches[DEFAULT_OCR_CACHE_PATH] = OcrCache(DEFAULT_OCR_CACHE_PATH, max_mb)
+            atexit.register(cache.close)  # writes back the pending LRU stamps
+        cache.max_bytes = max_mb * 1024 * 1024
+        return cache
+
+def list_pdfs(folder):
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".pdf"))
+
+def list_search_files(folder):
+    # collect files (pdf + images)
+    file_list = []
+    for root, _, files in os.walk(folder):
+        for f in files:
+            if f.lower().endswith((".pdf", ".png", ".jpg", ".jpeg")):
+                file_list.append(os.path.abspath(os.path.join(root, f)))
+    return file_list
+
+def shard_files(files, spec):
+    """Keep the K-th of N interleaved shards of `files` for a spec like "2/8" (0-based K)."""
+    try:
+        k, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise EngineError(f"Invalid shard '{spec}', expected K/N such as 0/4.")
+    if n < 1 or not 0 <= k < n:
+        raise EngineError(f"Invalid shard '{spec}', K must be in 0..N-1.")
+    return [f for i, f in enumerate(sorted(files)) if i % n == k]
+
+# -----------------------------
+# Engine
+# -----------------------------
+class Engine:
+    """Convert and search pipelines shared by the GUI and the command line.
+
+    `log(*args)` receives human readable lines and `progress(done, total, text)`
+    drives a progress bar / status label; both are no-ops when not given.
+    """
+
+    def __init__(self, settings=None, log=None, progress=None):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self.log = log or (lambda *args: None)
+        self.progress = progress or (lambda done, total, text=None: None)
+        self.profiler = Profiler()
+        self.cancelled = threading.Event()
+        self.running = threading.Event()  # cleared while paused
+        self.running.set()
+        self._ocr_pool = None  # OCR threads of the current run, see ocr_threads
+        self.report_timing = True  # False: the caller collects self.profiler itself (watch mode)
+
+    def cancel(self):
+        """Stop the running job after the pages already in flight. Search results so far
+        are kept; a conversion checkpoints its current file so the next run resumes it."""
+        self.cancelled.set()
+        self.running.set()  # a paused job has to wake up to stop
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def wait_if_paused(self):
+        """Page-level checkpoint of long runs: blocks while the engine is paused and
+        returns True once it is cancelled."""
+        if not self.running.is_set():
+            t0 = time.perf_counter()
+            self.running.wait()
+            self.profiler.add("paused", t0, time.perf_counter() - t0)
+        return self.cancelled.is_set()
+
+    def _int(self, name):
+        return int(self.settings.get(name) or DEFAULT_SETTINGS[name])
+
+    def _str(self, name):
+        return str(self.settings.get(name) or "").strip()
+
+    def make_matcher(self, keywords, workers=-1):
+        if self.settings.get("phonetic"):
+            return PhoneticMatcher(keywords, self._int("fuzzy"))
+        return KeywordMatcher(keywords, self._int("fuzzy"), workers)
+
+    def tesseract_cmd(self):
+        tess = self._str("tesseract_cmd")
+        return (shutil.which(tess) or tess) if tess else ""
+
+    def preprocess_key(self, split=False):
+        """Short signature of the preprocessing settings, part of the manifest / index keys."""
+        parts = [self._str("ocr_image") or DEFAULT_OCR_IMAGE, f"min{self.settings.get('min_dpi') or 0}"]
+        if self.settings.get("deskew"):
+            parts.append("deskew")
+        if split and self.settings.get("crop_split"):
+            parts.append("split")
+        return "-".join(parts)
+
+    def prepare_page(self, page, split=False):
+        """Rasterize a page for OCR: (plan, [PIL images]) after adaptive DPI, deskew,
+        gray / binary conversion and (split=True) margin crop + column split.
+        plan["dpi"] is the render DPI, plan["angle"] the deskew rotation."""
+        max_dpi = self._int("dpi")
+        mode = self._str("ocr_image") or DEFAULT_OCR_IMAGE
+        min_dpi = min(int(self.settings.get("min_dpi") or 0), max_dpi)
+        deskew = bool(self.settings.get("deskew"))
+        split = split and bool(self.settings.get("crop_split"))
+        plan = {"dpi": max_dpi, "angle": 0.0, "box": None, "columns": []}
+        name = os.path.basename(page.parent.name or "")
+        if min_dpi or deskew or split:
+            with self.profiler.span("probe", file=name, page=page.number + 1):
+                pix = page.get_pixmap(dpi=PROBE_DPI, colorspace=fitz.csGRAY)
+                gray = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+                plan = plan_page(gray, max_dpi, min_dpi, deskew, split)
+        with self.profiler.span("rasterize", file=name, page=page.number + 1, dpi=plan["dpi"]):
+            pix = page.get_pixmap(dpi=plan["dpi"], colorspace=fitz.csRGB if mode == "color" else fitz.csGRAY)
+            img = pixmap_to_image(pix)
+            del pix
+        with self.profiler.span("preprocess"):
+            return plan, preprocess_image(img, plan, mode, split)
+
+    def log_cache_counters(self, cache, before):
+        if cache is None:
+            return
+        hits, misses = cache.counters()
+        self.log(f"OCR cache: {hits - before[0]} hits / {misses - before[1]} misses "
+                 f"(session total {hits} / {misses}).")
+
+    def start_profile(self):
+        self.profiler.reset(keep_spans=bool(self._str("trace_path")))
+
+    def report_profile(self, title):
+        """Log the per-stage timing table and write the Chrome trace if one is configured."""
+        if not self.report_timing:
+            return
+        self.log(f"{title} timing:")
+        for line in self.profiler.summary_lines():
+            self.log("  " + line)
+        trace = self._str("trace_path")
+        if trace:
+            try:
+                self.profiler.write_chrome_trace(trace)
+                self.log("Trace written:", trace)
+            except OSError as e:
+                self.log("Could not write trace", trace, ":", e)
+
+    # ----------------- Conversion Flow -----------------
+    def convert_images_only(self, inp, out):
+        poppler = self._str("poppler_path")
+        dpi = self._int("dpi")
+        if not inp or not os.path.isdir(inp) or not out:
+            raise EngineError("Select valid input and output folders.")
+        pdfs = list_pdfs(inp)
+        self.progress(0, len(pdfs))
+        for cnt, src in enumerate(pdfs, start=1):
+            if self.wait_if_paused():
+                self.log("Image conversion cancelled.")
+                return
+            f = os.path.basename(src)
+            try:
+                name = os.path.splitext(f)[0]
+                out_dir = os.path.join(out, name)
+                os.makedirs(out_dir, exist_ok=True)
+                pages = pdf2image.convert_from_path(src, dpi=dpi, poppler_path=poppler)
+                for i, p in enumerate(pages, start=1):
+                    out_file = os.path.join(out_dir, f"{name}_page_{i}.png")
+                    p.save(out_file, "PNG")
+                self.log(f"Converted {f} -> {len(pages)} images.")
+            except Exception as e:
+                self.log("Error converting", f, ":", e)
+            self.progress(cnt, len(pdfs))
+        self.log("Image conversion done.")
+
+    def check_convert(self, inp, out):
+        if not inp or not os.path.isdir(inp) or not out or not os.path.isdir(out):
+            raise EngineError("Select valid input and output folders.")
+        tess = self.tesseract_cmd()
+        if not tess or not os.path.isfile(tess):
+            raise EngineError("Provide valid tesseract.exe path in Settings.")
+
+    def convert_folder(self, inp, out, files=None, on_file=None):
+        """Convert the PDFs of `inp` (or just `files`) into searchable PDFs under `out`.
+
+        Runs are resumable: a manifest next to the outputs records per-file and
+        per-page progress, interrupted files continue from their last checkpoint,
+        and up-to-date outputs (or, in incremental mode, files unchanged since the
+        last run) are skipped. `on_file(record)` is called once per input with its
+        status. Returns a summary dict.
+        """
+        self.check_convert(inp, out)
+        tess = self.tesseract_cmd()
+        lang = self._str("ocr_lang")
+        dpi = self._int("dpi")
+        # "overlay": outputs keep the source page and only gain Tesseract's text layer
+        ocr_key = f"{lang}@{dpi}/{self.preprocess_key()}/overlay"
+        pdfs = list_pdfs(inp) if files is None else list(files)
+        summary = {"files": len(pdfs), "converted": 0, "failed": 0, "skipped": 0, "pages": 0, "cancelled": False}
+        if not pdfs:
+            return summary
+        prof = self.profiler
+        self.start_profile()
+
+        # prepare output base
+        base_out = out
+        if self.settings.get("create_subfolder"):
+            base_out = os.path.join(out, DEFAULT_OUTPUT_DIRNAME)
+            os.makedirs(base_out, exist_ok=True)
+        manifest = ConvertManifest(os.path.join(base_out, CONVERT_MANIFEST_NAME))
+
+        jobs = []
+        for src in pdfs:
+            f = os.path.basename(src)
+            job = {"name": f, "src": os.path.abspath(src), "error": None,
+                   "out": os.path.join(base_out, os.path.splitext(f)[0] + "_searchable.pdf")}
+            job["part"] = job["out"] + ".part"
+            reason = self._skip_reason(job, manifest, ocr_key)
+            if reason:
+                summary["skipped"] += 1
+                prof.count("files_skipped")
+                self.log(f"Skipped: {f} ({reason})")
+                if on_file:
+                    on_file({"file": job["src"], "output": job["out"], "status": "skipped", "error": ""})
+                continue
+            job["start"] = self._resume_point(job, manifest.get(job["src"]), manifest, ocr_key)
+            job["pages"] = count_pdf_pages(src)
+            jobs.append(job)
+        if summary["skipped"]:
+            self.log(f"{summary['skipped']} file(s) skipped, {len(jobs)} to convert.")
+
+        workers = max(1, self._int("ocr_workers"))
+        total_pages = max(sum(max(job["pages"] - job["start"], 0) for job in jobs), 1)
+        stats = PageThroughput()
+        cache = shared_ocr_cache(self.settings)
+        cache_before = cache.counters() if cache else (0, 0)
+
+        def report(text):
+            self.progress(stats.done, total_pages,
+                          f"{text} | {stats.pages_per_sec():.2f} pages/sec | queue: {stats.queue_depth()}")
+
+        def ocr_batch(pngs, job, first, page_dpi):
+            with prof.span("ocr", file=job["name"], page=first + 1, pages=len(pngs), dpi=page_dpi):
+                return ocr_images(pngs, tess, lang, "textpdf", cache, page_dpi)
+
+        def submit(pool, job, first, pngs, page_dpi):
+            # step2: OCR a batch of pages -> single-page PDF bytes (one tesseract process, in the pool)
+            stats.add_submitted(len(pngs))
+            prof.count("pages_ocr", len(pngs))
+            fut = pool.submit(ocr_batch, pngs, job, first, page_dpi)
+            fut.add_done_callback(functools.partial(stats.page_done, n=len(pngs)))
+            pending.extend((job, fut, first + i, i) for i in range(len(pngs)))
+
+        def finish(job):
+            if self.cancelled.is_set() and job["error"] is None and job["doc"].page_count < job["pages"]:
+                # cancelled mid-file: keep what is done as a checkpoint for the next run
+                done = job["doc"].page_count
+                if done:
+                    self._checkpoint(job, manifest)
+                job["doc"].close()
+                job["src_doc"].close()
+                self.log(f"Cancelled: {job['name']} after {done}/{job['pages']} pages (the next run resumes it).")
+                if on_file:
+                    on_file({"file": job["src"], "output": "", "status": "cancelled", "error": ""})
+                return
+            ok = self._finish_converted_file(job, manifest)
+            prof.add("file", job["t0"], time.perf_counter() - job["t0"], {"file": job["name"], "ok": ok})
+            summary["converted" if ok else "failed"] += 1
+            if on_file:
+                on_file({"file": job["src"], "output": job["out"] if ok else "",
+                         "status": "ok" if ok else "error", "error": "" if ok else str(job["error"])})
+
+        # Pages of every PDF go into one pool so Tesseract keeps all cores busy.
+        # Each page is rendered in-process, OCR'd through pipes in batches of
+        # `batch_pages` and appended to its output document in page order; at most
+        # `window` rendered pages are held.
+        batch_pages = max(1, self._int("ocr_batch_pages"))
+        window = (workers + 1) * batch_pages
+        pending = deque()  # (job, future, page no, index in batch) in file/page order; future None = end of file
+
+        def drain(block=False):
+            while pending:
+                job, fut, pno, idx = pending[0]
+                if fut is not None and not fut.done() and not block and len(pending) <= window:
+                    return
+                while fut is not None and not fut.done():
+                    wait([fut], timeout=0.5)
+                    report(f"OCR {job['name']}")
+                pending.popleft()
+                if fut is None:
+                    finish(job)
+                else:
+                    self._append_ocr_page(job, fut, pno, idx, manifest)
+
+        try:
+            with self.ocr_threads() as pool:
+                for c, job in enumerate(jobs, start=1):
+                    if self.wait_if_paused():
+                        break
+                    report(f"Converting {job['name']} ({c}/{len(jobs)})")
+                    job["t0"] = time.perf_counter()
+                    try:
+                        if job["start"]:
+                            self.log(f"Resuming {job['name']} at page {job['start'] + 1}/{job['pages']}")
+                            job["doc"] = fitz.open(job["part"])
+                        else:
+                            job["doc"] = fitz.open()
+                        manifest.update(job["src"], ocr_key=ocr_key, pages=job["pages"], pages_done=job["start"],
+                                        status="partial", output=job["out"], error="",
+                                        **ConvertManifest.fingerprint(job["src"]))
+                        batch, first, batch_dpi = [], job["start"], dpi
+                        # the source stays open until the file is finished: its pages become the output pages
+                        src_doc = job["src_doc"] = fitz.open(job["src"])
+                        job["angles"] = {}
+                        for pno in range(job["start"], src_doc.page_count):
+                            if self.wait_if_paused():
+                                break
+                            # step1: page -> preprocessed PNG bytes (no temp files); the
+                            # preprocessed image is only what Tesseract reads
+                            plan, (img,) = self.prepare_page(src_doc[pno])
+                            page_dpi = plan["dpi"]
+                            job["angles"][pno] = plan["angle"]
+                            with prof.span("png_encode"):
+                                buf = io.BytesIO()
+                                img.save(buf, "PNG", compress_level=1)
+                            img.close()
+                            # a batch shares one --dpi, so a DPI change starts a new one
+                            if batch and page_dpi != batch_dpi:
+                                submit(pool, job, first, batch, batch_dpi)
+                                batch, first = [], pno
+                                drain()
+                            batch_dpi = page_dpi
+                            batch.append(buf.getvalue())
+                            del buf
+                            if len(batch) >= batch_pages:
+                                submit(pool, job, first, batch, batch_dpi)
+                                batch, first = [], pno + 1
+                                drain()
+                        if batch:
+                            submit(pool, job, first, batch, batch_dpi)
+                    except Exception as e:
+                        job["error"] = e
+                        job.setdefault("doc", fitz.open())
+                        job.setdefault("src_doc", fitz.open())
+                    pending.append((job, None, None, None))
+                    drain()
+                # step3: drain the remaining pages in order
+                drain(block=True)
+        finally:
+            manifest.close()
+
+        summary["pages"] = stats.done
+        summary["cancelled"] = self.cancelled.is_set()
+        report("Conversion cancelled." if summary["cancelled"] else "Conversion completed.")
+        done = "Conversion cancelled." if summary["cancelled"] else "All PDFs converted to searchable PDFs."
+        self.log(f"{done} {stats.done} pages, {stats.pages_per_sec():.2f} pages/sec with {workers} workers.")
+        self.log_cache_counters(cache, cache_before)
+        self.report_profile("Conversion")
+        return summary
+
+    def _skip_reason(self, job, manifest, ocr_key):
+        src, out = job["src"], job["out"]
+        entry = manifest.get(src)
+        # failed files are retried: the cause (no Tesseract, a locked file...) may be gone
+        if self.settings.get("incremental") and entry and entry["status"] == "done" \
+                and manifest.is_unchanged(entry, src, ocr_key):
+            return "unchanged since last run"
+        if self.settings.get("skip_up_to_date") and os.path.exists(out) \
+                and os.path.getmtime(out) >= os.path.getmtime(src):
+            return "output is newer than source"
+        return None
+
+    def _resume_point(self, job, entry, manifest, ocr_key):
+        """Pages already in a usable .part output from an interrupted run, else 0."""
+        if entry is None or entry["status"] != "partial" or not entry["pages_done"]:
+            return 0
+        if manifest.is_unchanged(entry, job["src"], ocr_key) and os.path.exists(job["part"]):
+            try:
+                with fitz.open(job["part"]) as part:
+                    # pages are appended in order, so the part's length is the resume point
+                    return min(part.page_count, entry["pages"] or part.page_count)
+            except Exception:
+                pass
+        return 0
+
+    def _append_ocr_page(self, job, fut, pno, idx, manifest):
+        # step3: append source page `pno` with its OCR text layer to the output (blocks until its batch is ready)
+        doc = job["doc"]
+        try:
+            page_bytes = fut.result()[idx]
+            with self.profiler.span("merge", file=job["name"], page=pno + 1):
+                doc.insert_pdf(job["src_doc"], from_page=pno, to_page=pno)
+                with fitz.open("pdf", page_bytes) as text_pdf:
+                    overlay_text_layer(doc[-1], text_pdf, job["angles"].pop(pno, 0.0))
+        except Exception as e:
+            self.log("OCR error in", job["name"], "page", doc.page_count + 1, ":", e)
+            job["error"] = job["error"] or e
+            return
+        if job["error"] is None and doc.page_count % CHECKPOINT_PAGES == 0:
+            self._checkpoint(job, manifest)
+
+    def _checkpoint(self, job, manifest):
+        # first checkpoint writes the .part file; later ones only append to it
+        try:
+            t0 = time.perf_counter()
+            doc = job["doc"]
+            if doc.name and os.path.abspath(doc.name) == os.path.abspath(job["part"]):
+                doc.saveIncr()
+            else:
+                tmp = job["part"] + ".tmp"
+                doc.save(tmp)
+                os.replace(tmp, job["part"])
+                doc.close()
+                job["doc"] = fitz.open(job["part"])
+            manifest.update(job["src"], pages_done=job["doc"].page_count)
+            self.profiler.add("checkpoint", t0, time.perf_counter() - t0, {"file": job["name"]})
+        except Exception as e:
+            self.log("Checkpoint failed for", job["name"], ":", e)
+
+    def _finish_converted_file(self, job, manifest):
+        # end of file: write the finished document
+        doc = job["doc"]
+        job["src_doc"].close()
+        try:
+            if job["error"] is None and doc.page_count == 0:
+                job["error"] = "no pages"
+            if job["error"] is None:
+                tmp = job["out"] + ".tmp"
+                with self.profiler.span("save", file=job["name"]):
+                    doc.save(tmp, garbage=3, deflate=True)
+                doc.close()
+                os.replace(tmp, job["out"])
+        except Exception as e:
+            job["error"] = e
+        finally:
+            if not doc.is_closed:
+                doc.close()
+        # only a finished (or failed) file gives up its checkpoint
+        if os.path.exists(job["part"]):
+            os.remove(job["part"])
+        if job["error"] is not None:
+            self.log("Error processing", job["name"], ":", job["error"])
+            manifest.update(job["src"], status="failed", error=str(job["error"]), pages_done=0)
+            return False
+        manifest.update(job["src"], status="done", pages_done=job["pages"], error="")
+        self.log(f"Converted: {job['name']} -> {job['out']}")
+        return True
+
+    # ----------------- Search Flow -----------------
+    def check_search(self, folder, keywords):
+        if not folder or not os.path.isdir(folder):
+            raise EngineError("Select valid folder to search.")
+        if not keywords:
+            raise EngineError("Enter search terms (comma separated).")
+
+    def search(self, folder, keywords, on_match=None, files=None):
+        """Search `folder` (or just `files`) for `keywords`.
+
+        `on_match(file_path, record)` gets every hit as a RESULT_COLUMNS dict. Returns a summary dict.
+        """
+        self.check_search(folder, keywords)
+        matcher = self.make_matcher(keywords)
+        file_list = list_search_files(folder) if files is None else [os.path.abspath(f) for f in files]
+        summary = {"files": len(file_list), "matches": 0, "errors": 0, "cancelled": False}
+        if not file_list:
+            return summary
+        self.start_profile()
+
+        def emit_recs(file_path, recs):
+            for rec in recs:
+                summary["matches"] += 1
+                if on_match:
+                    on_match(file_path, rec)
+
+        def emit(file_path, page_no, text, mode):
+            emit_recs(file_path, self._search_text_in_doc(file_path, page_no, text, matcher, mode))
+
+        total = len(file_list)
+        self.progress(0, total)
+        cache = shared_ocr_cache(self.settings)
+        cache_before = cache.counters() if cache else (0, 0)
+        pool = self.search_pool(file_list)
+        with self.ocr_threads():
+            if self.settings.get("use_index"):
+                try:
+                    self._search_with_index(folder, file_list, matcher, emit, summary, prune=files is None,
+                                            pool=pool, emit_recs=emit_recs)
+                except sqlite3.Error as e:
+                    summary["errors"] += 1
+                    self.log("Index error:", e)
+            elif pool is not None:
+                # text layers are read and matched in worker processes; scans are OCR'd here
+                for processed, (fp, pages, err) in enumerate(self.scan_files_parallel(pool, file_list, keywords), start=1):
+                    self.progress(processed, total, f"Scanning: {os.path.basename(fp)} ({processed}/{total})")
+                    if err:
+                        summary["errors"] += 1
+                        self.log("Scan error:", fp, err)
+                    for page_no, text, mode, recs in pages:
+                        if recs is None:
+                            emit(fp, page_no, text, mode)
+                        else:
+                            emit_recs(fp, recs)
+            else:
+                for processed, fp in enumerate(file_list, start=1):
+                    if self.wait_if_paused():
+                        break
+                    self.progress(processed, total, f"Scanning: {os.path.basename(fp)} ({processed}/{total})")
+                    try:
+                        with self.profiler.span("file", file=os.path.basename(fp)):
+                            for page_no, text, mode in self.extract_file_pages(fp):
+                                emit(fp, page_no, text, mode)
+                    except Exception as e:
+                        summary["errors"] += 1
+                        self.log("Scan error:", fp, e)
+
+        summary["cancelled"] = self.cancelled.is_set()
+        self.progress(total, total, "Search cancelled." if summary["cancelled"] else "Search completed.")
+        self.log("Search cancelled." if summary["cancelled"] else "Search done.", "Matches:", summary["matches"])
+        self.log_cache_counters(cache, cache_before)
+        self.profiler.count("matches", summary["matches"])
+        self.report_profile("Search")
+        return summary
+
+    def index_key(self):
+        """OCR / extraction settings (and Tesseract build) a page index entry was built with."""
+        engine = "tesserocr" if module_available(tesserocr) else tesseract_version(self.tesseract_cmd())
+        return (f"{self._str('ocr_lang')}@{self._int('dpi')}/{self.preprocess_key(split=True)}/v{EXTRACT_VERSION}"
+                f"/{engine}")
+
+    def update_index(self, index, folder, file_list, summary, prune=True, pool=None):
+        """Incremental pass: only new or changed files are opened / OCR'd (text layers in
+        the worker processes of `pool`, if given)."""
+        total = len(file_list)
+        ocr_key = self.index_key()
+        removed = index.prune(folder, file_list) if prune else 0
+        reindexed = 0
+        changed = []
+        for fp in file_list:
+            try:
+                if not index.is_current(fp, ocr_key):
+                    changed.append(fp)
+            except OSError as e:
+                summary["errors"] += 1
+                self.log("Scan error:", fp, e)
+        with self.ocr_threads():
+            if pool is not None:
+                for processed, (fp, pages, err) in enumerate(self.scan_files_parallel(pool, changed), start=1):
+                    self.progress(processed, len(changed), f"Indexing: {os.path.basename(fp)} ({processed}/{len(changed)})")
+                    if err:
+                        summary["errors"] += 1
+                        self.log("Scan error:", fp, err)
+                        continue
+                    index.replace_file(fp, [(page_no, text, mode) for page_no, text, mode, _ in pages], ocr_key)
+                    reindexed += 1
+            else:
+                for processed, fp in enumerate(changed, start=1):
+                    if self.wait_if_paused():
+                        break
+                    try:
+                        self.progress(processed, len(changed), f"Indexing: {os.path.basename(fp)} ({processed}/{len(changed)})")
+                        with self.profiler.span("index_file", file=os.path.basename(fp)):
+                            pages = self.extract_file_pages(fp)
+                            if self.cancelled.is_set():
+                                break  # a file cut short is not stored
+                            index.replace_file(fp, pages, ocr_key)
+                        reindexed += 1
+                    except Exception as e:
+                        summary["errors"] += 1
+                        self.log("Scan error:", fp, e)
+        failed = f", {len(changed) - reindexed} not readable" if reindexed < len(changed) else ""
+        self.log(f"Index updated: {reindexed} file(s) re-indexed, {total - len(changed)} unchanged, {removed} removed{failed}.")
+
+    def _search_with_index(self, folder, file_list, matcher, emit, summary, prune=True, pool=None, emit_recs=None):
+        total = len(file_list)
+        index_path = self._str("index_path") or DEFAULT_INDEX_PATH
+        with PageTextIndex(index_path) as index:
+            self.update_index(index, folder, file_list, summary, prune, pool)
+            if self.cancelled.is_set():
+                return
+
+            # exact searches only touch pages the FTS index says contain a term,
+            # phonetic ones only pages holding all word keys of a keyword
+            terms = matcher.terms if matcher.threshold >= 100 and isinstance(matcher, KeywordMatcher) else None
+            candidates = None
+            if isinstance(matcher, PhoneticMatcher):
+                with self.profiler.span("phonetic_lookup"):
+                    candidates = index.phonetic_pages(matcher.key_groups)
+                self.log(f"Phonetic index: {sum(len(p) for p in candidates.values())} candidate page(s).")
+            if pool is not None and terms is None and candidates is None:
+                # fuzzy search over every stored page: score the files in the worker processes
+                tasks = ((fp, (_match_index_file, dict(self.settings), index_path, fp, matcher.keywords))
+                         for fp in file_list)
+                for processed, (fp, res) in enumerate(self.run_ordered(pool, tasks), start=1):
+                    self.progress(processed, total, f"Searching index: {os.path.basename(fp)} ({processed}/{total})")
+                    if isinstance(res, Exception):
+                        summary["errors"] += 1
+                        self.log("Index error:", fp, res)
+                        continue
+                    recs, start, dur = res
+                    self.profiler.add("index_match", start, dur, {"file": os.path.basename(fp)})
+                    emit_recs(fp, recs)
+                return
+            for processed, fp in enumerate(file_list, start=1):
+                if self.wait_if_paused():
+                    return
+                pages = None if candidates is None else candidates.get(fp)
+                if candidates is not None and not pages:
+                    continue
+                self.progress(processed, total, f"Searching index: {os.path.basename(fp)} ({processed}/{total})")
+                with self.profiler.span("index_read", file=os.path.basename(fp)):
+                    for page_no, text, mode in index.iter_pages(fp, terms, pages):
+                        emit(fp, page_no, text, mode)
+
+    # ----------------- Parallel search (worker processes) -----------------
+    def search_pool(self, file_list):
+        """Shared worker-process pool for `file_list`, or None when one process is
+        enough (search_workers <= 1, or less than one task's worth of pages)."""
+        workers = int(self.settings.get("search_workers") or 0)
+        if workers <= 1:
+            return None
+        pages = 0
+        for fp in file_list:
+            pages += count_pdf_pages(fp) if fp.lower().endswith(".pdf") else 0
+            if pages > SEARCH_CHUNK_PAGES:
+                return shared_search_pool(workers)
+        return None
+
+    def run_ordered(self, pool, tasks):
+        """Run `tasks` [(tag, (fn, *args))] on the pool and yield (tag, result) in task
+        order; a failed task yields its exception instead, a None call yields None.
+        At most two tasks per worker are in flight; nothing new is submitted while
+        the engine is paused or once it is cancelled."""
+        window = 2 * max(1, int(self.settings.get("search_workers") or 1))
+        pending = deque()
+        tasks = iter(tasks)
+        try:
+            while True:
+                while len(pending) < window and not self.wait_if_paused():
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    tag, call = task
+                    try:
+                        pending.append((tag, pool.submit(*call) if call else None))
+                    except BrokenProcessPool as e:
+                        pending.append((tag, e))
+                if not pending or self.cancelled.is_set():
+                    return
+                tag, fut = pending.popleft()
+                if fut is None or isinstance(fut, Exception):
+                    yield tag, fut
+                    continue
+                try:
+                    res = fut.result()
+                except BrokenProcessPool as e:
+                    drop_search_pool(pool)  # a worker died (e.g. a crash in MuPDF); the next search starts fresh
+                    res = e
+                except Exception as e:
+                    res = e
+                yield tag, res
+        finally:
+            for _, fut in pending:
+                if fut is not None and not isinstance(fut, Exception):
+                    fut.cancel()
+
+    def scan_files_parallel(self, pool, file_list, keywords=None):
+        """Yield (path, [(page_no, text, mode, recs)], error) per file, in file_list order.
+
+        PDF text layers are read in the worker processes, SEARCH_CHUNK_PAGES pages per
+        task, and matched there when `keywords` are given (recs then holds the page's
+        matches and text is left out; otherwise recs is None). Pages without a usable
+        text layer, and image files, are OCR'd here by the batched OCR pool.
+        """
+        settings = dict(self.settings)
+
+        def tasks():
+            for fp in file_list:
+                n = count_pdf_pages(fp) if fp.lower().endswith(".pdf") else 0
+                if not n:
+                    yield (fp, True), None  # images (and unreadable PDFs) are read here
+                    continue
+                for first in range(0, n, SEARCH_CHUNK_PAGES):
+                    yield ((fp, first + SEARCH_CHUNK_PAGES >= n),
+                           (_scan_pdf_chunk, settings, fp, first, first + SEARCH_CHUNK_PAGES, keywords))
+
+        pages, need_ocr, err = [], [], None
+        for (fp, last), res in self.run_ordered(pool, tasks()):
+            if res is None:
+                try:
+                    pages = [(page_no, text, mode, None) for page_no, text, mode in self.extract_file_pages(fp)]
+                except Exception as e:
+                    err = e
+            elif isinstance(res, Exception):
+                err = err or res
+            else:
+                chunk_pages, chunk_ocr, start, dur = res
+                self.profiler.add("scan_chunk", start, dur, {"file": os.path.basename(fp), "pages": len(chunk_pages)})
+                self.profiler.count("pages_text_layer", len(chunk_pages))
+                pages.extend((page_no, text, "searchable", recs) for page_no, text, recs in chunk_pages)
+                need_ocr.extend(chunk_ocr)
+            if not last:
+                continue
+            if need_ocr and not err:
+                self.profiler.count("pages_ocr", len(need_ocr))
+                try:
+                    with fitz.open(fp) as doc:
+                        pages.extend((pno + 1, text, "ocr", None) for pno, text in self.ocr_doc_pages(doc, need_ocr))
+                except Exception as e:
+                    err = e
+            if self.cancelled.is_set():
+                return  # OCR of this file was cut short
+            yield fp, sorted(pages, key=lambda pg: pg[0] or 0), err
+            pages, need_ocr, err = [], [], None
+
+    # ----------------- Voter Records -----------------
+    def check_records(self, folder):
+        if not folder or not os.path.isdir(folder):
+            raise EngineError("Select valid folder to read voter records from.")
+
+    def build_records(self, folder, files=None):
+        """Parse the voter cards of every roll in `folder` (or just `files`) into the record store.
+
+        Page text comes from the search index (brought up to date first, so scans are
+        OCR'd once for search and records alike); text-layer pages are re-read as word
+        boxes. Only rolls that changed since their records were written are parsed.
+        """
+        self.check_records(folder)
+        store = RecordStore(self._str("records_dir") or DEFAULT_RECORDS_DIR)
+        file_list = list_search_files(folder) if files is None else [os.path.abspath(f) for f in files]
+        summary = {"files": len(file_list), "parsed": 0, "records": 0, "errors": 0}
+        if not file_list:
+            return summary
+        self.start_profile()
+        total = len(file_list)
+        index_key = self.index_key()
+        key = f"{index_key}/r{RECORDS_VERSION}"
+        with PageTextIndex(self._str("index_path") or DEFAULT_INDEX_PATH) as index:
+            self.update_index(index, folder, file_list, summary, prune=files is None, pool=self.search_pool(file_list))
+            removed = store.prune(folder, file_list) if files is None else 0
+            for processed, fp in enumerate(file_list, start=1):
+                if self.wait_if_paused():
+                    break
+                try:
+                    if store.is_current(fp, key):
+                        continue
+                    if not index.is_current(fp, index_key):
+                        continue  # could not be read (counted by update_index): no records until it can
+                    self.progress(processed, total, f"Reading records: {os.path.basename(fp)} ({processed}/{total})")
+                    with self.profiler.span("records_file", file=os.path.basename(fp)):
+                        records = self.extract_records(fp, index)
+                        store.write_file(fp, records, key)
+                    summary["parsed"] += 1
+                    summary["records"] += len(records)
+                except Exception as e:
+                    summary["errors"] += 1
+                    self.log("Records error:", fp, e)
+        self.progress(total, total, "Voter records updated.")
+        self.log(f"Voter records: {summary['parsed']} file(s) parsed ({summary['records']} records), "
+                 f"{total - summary['parsed'] - summary['errors']} unchanged, {removed} removed, {summary['errors']} failed.")
+        self.report_profile("Records")
+        return summary
+
+    def extract_records(self, fp, index):
+        """Record dicts (record_schema fields) of one indexed file."""
+        records = []
+        ward = part = ""
+        doc = fitz.open(fp) if fp.lower().endswith(".pdf") else None
+        try:
+            for page_no, text, mode in index.iter_pages(fp):
+                if mode == "searchable" and doc is not None:
+                    lines = page_card_lines(doc[page_no - 1])
+                else:
+                    lines = (text or "").splitlines()
+                ward, part = roll_header(lines, ward, part)
+                for card in parse_voter_cards(lines):
+                    card.update(path=fp, page=page_no or 0, ward=ward, part=part)
+                    records.append(card)
+        finally:
+            if doc is not None:
+                doc.close()
+        self.profiler.count("records", len(records))
+        return records
+
+    def query_records(self, **filters):
+        """DataFrame of stored records matching `filters` (see RecordStore.query)."""
+        store = RecordStore(self._str("records_dir") or DEFAULT_RECORDS_DIR)
+        with self.profiler.span("records_query"):
+            return store.query(**filters)
+
+    def extract_file_pages(self, fp):
+        """Return [(page_no, normalized_text, mode)] for a PDF or image file.
+
+        Pages with a usable text layer are read with PyMuPDF; only the others are
+        rasterized (in-process, no poppler) and OCR'd together, each page exactly once.
+        """
+        if not fp.lower().endswith(".pdf"):
+            # image file
+            return [(None, self.ocr_image(fp), "image")]
+        prof = self.profiler
+        pages = {}
+        need_ocr = []
+        with fitz.open(fp) as doc:
+            for pno in range(doc.page_count):
+                if self.wait_if_paused():
+                    break
+                page_text = self.page_text_layer(doc, pno)
+                if page_text:
+                    pages[pno+1] = (page_text, "searchable")
+                    prof.count("pages_text_layer")
+                else:
+                    need_ocr.append(pno)
+                    prof.count("pages_ocr")
+            # fallback OCR, only for the pages that need it
+            for pno, text in self.ocr_doc_pages(doc, need_ocr):
+                pages[pno+1] = (text, "ocr")
+        return [(page_no, text, mode) for page_no, (text, mode) in sorted(pages.items())]
+
+    def page_text_layer(self, doc, pno):
+        """Normalized text layer of page `pno`, "" when the page has to be OCR'd."""
+        prof = self.profiler
+        try:
+            page = doc[pno]
+            with prof.span("get_text", file=os.path.basename(doc.name), page=pno + 1):
+                raw = page.get_text("text") or ""
+            with prof.span("normalize"):
+                page_text = normalize_text(raw)
+            if not text_layer_usable(page_text):
+                return ""
+            if len(page_text) < MIN_TEXT_LAYER_CHARS and page.get_images():
+                return ""
+            return page_text
+        except Exception:
+            return ""
+
+    @contextmanager
+    def ocr_threads(self):
+        """OCR thread pool shared by every document of one convert / search / index run, so
+        each thread keeps its warm tesserocr engine (traineddata loaded once per thread, not
+        once per PDF). Nested uses share the outer pool; it is shut down when the
+        outermost one ends."""
+        if self._ocr_pool is not None:
+            yield self._ocr_pool
+            return
+        pool = self._ocr_pool = ThreadPoolExecutor(max_workers=max(1, self._int("ocr_workers")),
+                                                   thread_name_prefix="ocr")
+        try:
+            yield pool
+        finally:
+            self._ocr_pool = None
+            pool.shutdown(wait=True)
+
+    def ocr_doc_pages(self, doc, pnos):
+        """Yield (pno, text) for pages of an open fitz document, OCR'd in parallel in page order."""
+        if not pnos:
+            return
+        lang = self._str("ocr_lang")
+        tess = self.tesseract_cmd()
+        cache = shared_ocr_cache(self.settings)
+        workers = max(1, self._int("ocr_workers"))
+        batch_pages = max(1, self._int("ocr_batch_pages"))
+        name = os.path.basename(doc.name)
+
+        def ocr(imgs, first, dpi):
+            # a failure propagates: the file counts as an error and is not indexed as empty
+            try:
+                with self.profiler.span("ocr", file=name, page=first + 1, regions=len(imgs), dpi=dpi):
+                    return ocr_images(imgs, tess, lang, "txt", cache, dpi)
+            except Exception as e:
+                raise RuntimeError(f"OCR failed on page {first + 1}: {e}") from e
+            finally:
+                for img in imgs:
+                    img.close()
+
+        # a page may be split into several column regions; regions are the unit of
+        # a batch, so the columns of one page can be OCR'd by different workers
+        pending = deque()  # (pno, future, index in batch) in page / region order
+        batch = []  # (pno, region image, dpi) not submitted yet
+
+        def submit(pool):
+            fut = pool.submit(ocr, [img for _, img, _ in batch], batch[0][0], batch[0][2])
+            pending.extend((p, fut, i) for i, (p, _, _) in enumerate(batch))
+            batch.clear()
+
+        def pop(pool):
+            p = pending[0][0]
+            if batch and batch[0][0] == p:
+                submit(pool)  # the page's last regions are still waiting in the batch
+            texts = []
+            while pending and pending[0][0] == p:
+                _, fut, i = pending.popleft()
+                texts.append(fut.result()[i] if fut else "")
+            return p, "\n".join(t for t in texts if t)
+
+        with self.ocr_threads() as pool:
+            for pno in pnos:
+                if self.wait_if_paused():
+                    break
+                try:
+                    plan, regions = self.prepare_page(doc[pno], split=True)
+                    dpi = plan["dpi"]
+                except Exception as e:
+                    self.log("Render error:", doc.name, "page", pno + 1, e)
+                    if batch:
+                        submit(pool)
+                    pending.append((pno, None, None))
+                    continue
+                for img in regions:
+                    # a batch shares one --dpi, so a DPI change starts a new one
+                    if batch and (len(batch) >= batch_pages or batch[-1][2] != dpi):
+                        submit(pool)
+                    batch.append((pno, img, dpi))
+                # keep at most one batch per worker rendered ahead
+                while len(pending) > workers * batch_pages:
+                    yield pop(pool)
+            if batch:
+                submit(pool)
+            while pending:
+                yield pop(pool)
+
+    def _search_text_in_doc(self, file_path, page_no, text, matcher, mode):
+        if not text:
+            return []
+        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+        recs = []
+        with self.profiler.span("match"):
+            hits = matcher.match_lines(lines)
+        for idx, kw_idx in hits:
+            line = lines[idx]
+            low = max(0, idx-1)
+            high = min(len(lines)-1, idx+1)
+            context = " | ".join(lines[low:high+1])
+            recs.append({
+                "PDF File": os.path.basename(file_path),
+                "Page": page_no if page_no else "",
+                "Matched Term": matcher.keywords[kw_idx],
+                "Matched Line": line,
+                "Context (3 lines)": context,
+                "Mode": mode
+            })
+        return recs
+
+    def ocr_image(self, img_path):
+        with Image.open(img_path) as img:
+            self.profiler.count("images_ocr")
+            with self.profiler.span("ocr", file=os.path.basename(img_path)):
+                return ocr_image_to_text(img, self._str("ocr_lang"), self.tesseract_cmd(), shared_ocr_cache(self.settings))
+
+# -----------------------------
+# Job scheduler
+# -----------------------------
+PRIORITY_IDLE = -1  # watch-folder daemon: runs whenever nothing else is queued
+PRIORITY_BACKGROUND = 0  # bulk conversions
+PRIORITY_NORMAL = 1
+PRIORITY_URGENT = 2  # interactive searches: preempt everything else
+PRIORITY_NAMES = {PRIORITY_IDLE: "idle", PRIORITY_BACKGROUND: "background", PRIORITY_NORMAL: "normal", PRIORITY_URGENT: "urgent"}
+
+class Job:
+    """One queued run of `target(engine)`. `state` is queued / running / waiting
+    (preempted by a higher priority job) / paused (by the user) / done / cancelled / failed."""
+
+    def __init__(self, job_id, name, engine, target, priority):
+        self.id = job_id
+        self.name = name
+        self.engine = engine
+        self.target = target
+        self.priority = priority
+        self.state = "queued"
+        self.held = False
+        self.progress = (0, 0, "")
+        self.result = None
+        self.error = None
+        self.thread = None
+
+    @property
+    def finished(self):
+        return self.state in ("done", "cancelled", "failed")
+
+
+class JobScheduler:
+    """Runs one job at a time, highest priority first (oldest first within a priority).
+    A job that becomes the best runnable one pauses the running job at its next page
+    checkpoint (Engine.wait_if_paused) and takes over the CPUs; the preempted job
+    carries on where it stopped once nothing more urgent is left. `on_change(job)`
+    is called from worker threads on every state / progress change."""
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change or (lambda job: None)
+        self.jobs = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def submit(self, name, engine, target, priority=PRIORITY_NORMAL):
+        job = Job(next(self._ids), name, engine, target, priority)
+        report = engine.progress
+
+        def progress(done, total, text=None):
+            job.progress = (done, total, text or "")
+            report(done, total, text)
+            self.on_change(job)
+
+        engine.progress = progress
+        with self._lock:
+            self.jobs.append(job)
+            self._schedule()
+        self.on_change(job)
+        return job
+
+    def _schedule(self):
+        with self._lock:
+            live = [j for j in self.jobs if not j.finished]
+            runnable = [j for j in live if not j.held]
+            best = max(runnable, key=lambda j: (j.priority, -j.id), default=None)
+            for job in live:
+                if job is best:
+                    continue
+                state = "paused" if job.held else ("waiting" if job.thread else "queued")
+                if job.state != state:
+                    job.engine.pause()
+                    job.state = state
+                    self.on_change(job)
+            if best is None or best.state == "running":
+                return
+            best.state = "running"
+            best.engine.resume()
+            if best.thread is None:
+                best.thread = threading.Thread(target=self._run, args=(best,), daemon=True)
+                best.thread.start()
+            self.on_change(best)
+
+    def _run(self, job):
+        try:
+            job.result = job.target(job.engine)
+            state = "cancelled" if job.engine.cancelled.is_set() else "done"
+        except Exception as e:
+            job.error = e
+            state = "cancelled" if job.engine.cancelled.is_set() else "failed"
+        with self._lock:
+            job.state = state
+            self._schedule()
+        self.on_change(job)
+
+    def cancel(self, job):
+        with self._lock:
+            if job.finished:
+                return
+            job.engine.cancel()
+            if job.thread is None:
+                job.state = "cancelled"
+                self._schedule()
+        self.on_change(job)
+
+    def pause(self, job):
+        with self._lock:
+            if not job.finished:
+                job.held = True
+                self._schedule()
+
+    def resume(self, job):
+        with self._lock:
+            if not job.finished and job.held:
+                job.held = False
+                self._schedule()
+        self.on_change(job)
+
+    def set_priority(self, job, priority):
+        with self._lock:
+            job.priority = priority
+            self._schedule()
+        self.on_change(job)
+
+    def active(self):
+        with self._lock:
+            return [j for j in self.jobs if not j.finished]
+
+    def forget_finished(self):
+        with self._lock:
+            self.jobs = [j for j in self.jobs if not j.finished]
+
+# -----------------------------
+# Watch folder
+# -----------------------------
+class FolderWatcher:
+    """Keeps the searchable corpus of a folder current as files arrive.
+
+    New / modified files are picked up from filesystem events (watchdog) or, without
+    watchdog or with `watch_polling` (network shares often deliver no events), from a
+    stat-only poll every WATCH_POLL_SECS. A file is handed on only after it has stopped
+    changing for WATCH_SETTLE_SECS and can be opened (a PDF must also end in %%EOF, or
+    have been unchanged for WATCH_NO_EOF_SECS and open with PyMuPDF), so copies still in
+    progress are never read. With `out`, PDFs dropped into the folder are converted and
+    their searchable outputs indexed; without it the dropped files (PDFs and images,
+    subfolders included) are indexed as they are. At most `watch_workers` files are
+    processed at a time, and they share one pool of `ocr_workers` OCR threads.
+    """
+
+    def __init__(self, folder, out=None, settings=None, log=None, on_file=None):
+        # "" must not become the current directory
+        self.folder = os.path.abspath(folder) if folder and folder.strip() else ""
+        self.out = out or None
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self.log = log or (lambda *args: None)
+        self.on_file = on_file or (lambda rec: None)
+        self.recursive = self.out is None  # conversions read the top level only, like convert_folder
+        self.pending = {}  # path -> (stat signature, time it was last seen changing)
+        self.in_flight = set()
+        self.dirty = set()  # changed again while being processed
+        self.waiting = set()  # logged as still being copied
+        self.unopenable = {}  # path -> stat signature PyMuPDF could not open it with
+        self.seen = {}  # path -> stat signature it was last processed with
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.counts = {"converted": 0, "indexed": 0, "removed": 0, "failed": 0}
+        self.profiler = Profiler()  # stage timings of the files processed since the last report
+
+    def wants(self, path):
+        if os.path.basename(path).startswith("."):
+            return False
+        if self.out is not None:
+            return path.lower().endswith(".pdf") and os.path.dirname(path) == self.folder
+        return path.lower().endswith((".pdf", ".png", ".jpg", ".jpeg")) and path.startswith(os.path.join(self.folder, ""))
+
+    def touch(self, path):
+        """Note that `path` was created, modified or deleted."""
+        path = os.path.abspath(path)
+        if not self.wants(path):
+            return
+        with self.lock:
+            if path in self.in_flight:
+                self.dirty.add(path)
+            else:
+                self.pending[path] = (None, time.monotonic())
+        self.wake.set()
+
+    def dispatch(self, event):
+        # watchdog event handler interface; a move is a delete plus a create
+        if not event.is_directory:
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path:
+                    self.touch(os.fsdecode(path))
+
+    def _scan(self):
+        """{path: (mtime, size)} of the watched files (polling fallback only)."""
+        found = {}
+        dirs = [self.folder]
+        while dirs:
+            try:
+                entries = list(os.scandir(dirs.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if self.recursive:
+                            dirs.append(entry.path)
+                    elif self.wants(entry.path):
+                        st = entry.stat()
+                        found[entry.path] = (st.st_mtime, st.st_size)
+                except OSError:
+                    continue
+        return found
+
+    def _complete(self, path, sig, still_for):
+        """False while another process is still writing `path` (unchanged at `sig` for `still_for` s)."""
+        try:
+            with open(path, "rb") as fh:  # copies in progress are locked on Windows
+                if not path.lower().endswith(".pdf"):
+                    return True
+                fh.seek(max(os.fstat(fh.fileno()).st_size - 1024, 0))
+                if b"%%EOF" in fh.read():  # Explorer pre-sizes copies, so a stable size is not enough
+                    return True
+        except OSError:
+            return False
+        # padding or a signature after %%EOF (some scanners): wait longer, then trust PyMuPDF
+        if still_for < WATCH_NO_EOF_SECS or self.unopenable.get(path) == sig:
+            return False
+        try:
+            with fitz.open(path) as doc:
+                if doc.page_count:
+                    self.unopenable.pop(path, None)
+                    return True
+        except Exception:
+            pass
+        self.unopenable[path] = sig  # retried once the file changes
+        return False
+
+    def _ready(self, limit):
+        """Up to `limit` pending paths that have settled, moved to in_flight."""
+        now = time.monotonic()
+        with self.lock:
+            items = sorted(self.pending.items(), key=lambda item: item[1][1])
+        ready = []
+        for path, (sig, since) in items:
+            if len(ready) >= limit:
+                break
+            try:
+                st = os.stat(path)
+                new = (st.st_mtime, st.st_size)
+            except FileNotFoundError:
+                new = "gone"
+            except OSError:
+                continue
+            if new != sig:
+                with self.lock:
+                    if path in self.pending:
+                        self.pending[path] = (new, now)  # still changing: restart the clock
+                continue
+            if now - since < WATCH_SETTLE_SECS:
+                continue
+            if self.seen.get(path) == new:
+                # repeated events / poll hits for a file already handled in this state
+                with self.lock:
+                    self.pending.pop(path, None)
+                continue
+            if new != "gone" and not self._complete(path, new, now - since):
+                if path not in self.waiting:
+                    self.waiting.add(path)
+                    self.log(f"Watch: waiting for {os.path.basename(path)} to finish copying")
+                continue  # stays pending; its clock keeps running while it is unchanged
+            ready.append(path)
+            self.seen[path] = new
+        with self.lock:
+            for path in ready:
+                self.pending.pop(path, None)
+                self.in_flight.add(path)
+                self.waiting.discard(path)
+        return ready
+
+    def _file_engine(self, engine):
+        # one engine per file (engines are single-run), sharing the watch job's pause / cancel
+        # and OCR threads, so concurrent files never run more than ocr_workers Tesseracts
+        file_engine = Engine(self.settings, log=self.log)
+        file_engine.cancelled, file_engine.running = engine.cancelled, engine.running
+        file_engine._ocr_pool = engine._ocr_pool
+        file_engine.report_timing = False
+        return file_engine
+
+    def _report_timing(self):
+        """Log one timing table for everything processed since the last report."""
+        if self.profiler.stats:
+            self.log("Watch timing:")
+            for line in self.profiler.summary_lines():
+                self.log("  " + line)
+        self.profiler.reset()
+
+    def _index(self, engine, paths, prune=False):
+        summary = {"errors": 0}
+        with PageTextIndex(engine._str("index_path") or DEFAULT_INDEX_PATH) as index:
+            engine.update_index(index, self.folder, paths, summary, prune)
+        return not summary["errors"]
+
+    def _process(self, path, engine):
+        engine = file_engine = self._file_engine(engine)
+        rec = {"file": path, "output": "", "status": "ok", "error": ""}
+        try:
+            if not os.path.exists(path):
+                if self.out is None:
+                    with PageTextIndex(engine._str("index_path") or DEFAULT_INDEX_PATH) as index:
+                        index.remove_file(path)
+                    self._count("removed")
+                rec["status"] = "removed"  # searchable outputs of removed sources are kept
+            elif self.out is not None:
+                outputs = []
+                engine.convert_folder(self.folder, self.out, files=[path], on_file=outputs.append)
+                rec = outputs[0] if outputs else dict(rec, status="cancelled")
+                if rec["status"] == "ok":
+                    self._count("converted")
+                if rec["status"] in ("ok", "skipped") and not engine.cancelled.is_set():
+                    if self._index(engine, [rec["output"]]):
+                        self._count("indexed")
+            elif self._index(engine, [path]):
+                self._count("indexed")
+            else:
+                rec.update(status="error", error="could not be read")
+        except Exception as e:
+            rec.update(status="error", error=str(e))
+            self.log("Watch error:", path, e)
+        finally:
+            file_engine.profiler.count("watch_files")
+            self.profiler.merge(file_engine.profiler)
+            with self.lock:
+                self.in_flight.discard(path)
+                if path in self.dirty:
+                    self.dirty.discard(path)
+                    self.pending[path] = (None, time.monotonic())
+            self.wake.set()
+        if rec["status"] == "error":
+            self._count("failed")
+        self.on_file(rec)
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def _catch_up(self, engine):
+        # files that arrived while nobody was watching; the manifest / index skip the rest cheaply
+        engine = self._file_engine(engine)
+        if self.out is not None:
+            outputs = []
+            engine.convert_folder(self.folder, self.out, on_file=lambda rec: (outputs.append(rec), self.on_file(rec)))
+            done = [rec["output"] for rec in outputs if rec["status"] in ("ok", "skipped")]
+            if done and not engine.cancelled.is_set():
+                self._index(engine, done)
+        else:
+            self._index(engine, list_search_files(self.folder), prune=True)
+        self.profiler.merge(engine.profiler)
+
+    def _start_observer(self):
+        if self.settings.get("watch_polling") or not module_available(watchdog_observers):
+            return None
+        try:
+            observer = watchdog_observers.Observer()
+            observer.schedule(self, self.folder, recursive=self.recursive)
+            observer.start()
+            return observer
+        except OSError as e:  # e.g. out of inotify watches
+            self.log("Watch: filesystem events unavailable, polling instead:", e)
+            return None
+
+    def run(self, engine):
+        """Watch until `engine` is cancelled (a scheduler job target). Returns the counts."""
+        if not self.folder or not os.path.isdir(self.folder):
+            raise EngineError("Select a valid folder to watch.")
+        if self.out is not None:
+            engine.check_convert(self.folder, self.out)
+            base_out = os.path.join(self.out, DEFAULT_OUTPUT_DIRNAME) if self.settings.get("create_subfolder") else self.out
+            if os.path.abspath(base_out) == self.folder:
+                raise EngineError("Searchable PDFs would land in the watched folder: pick another output folder.")
+        observer = self._start_observer()
+        self.log(f"Watching {self.folder} ({'filesystem events' if observer else 'polling'}, "
+                 f"{'convert + index' if self.out else 'index'})")
+        snapshot = self._scan() if observer is None else None
+        next_poll = time.monotonic() + WATCH_POLL_SECS
+        next_report = time.monotonic() + WATCH_REPORT_SECS
+        workers = max(1, int(self.settings.get("watch_workers") or DEFAULT_WATCH_WORKERS))
+        running = set()
+        self.profiler.reset()
+        try:
+            with engine.ocr_threads(), ThreadPoolExecutor(max_workers=workers) as pool:
+                self._catch_up(engine)
+                try:
+                    while not engine.wait_if_paused():
+                        self.wake.wait(WATCH_TICK_SECS)
+                        self.wake.clear()
+                        if time.monotonic() >= next_report:
+                            self._report_timing()
+                            next_report = time.monotonic() + WATCH_REPORT_SECS
+                        if snapshot is not None and time.monotonic() >= next_poll:
+                            current = self._scan()
+                            for path in set(current) | set(snapshot):
+                                if current.get(path) != snapshot.get(path):
+                                    self.touch(path)
+                            snapshot, next_poll = current, time.monotonic() + WATCH_POLL_SECS
+                        running = {f for f in running if not f.done()}
+                        for path in self._ready(workers - len(running)):
+                            running.add(pool.submit(self._process, path, engine))
+                        waiting = len(self.pending) + len(running)
+                        engine.progress(self.counts["indexed"], self.counts["indexed"] + waiting,
+                                        f"Watching {os.path.basename(self.folder)}: {self.counts['converted']} converted, "
+                                        f"{self.counts['indexed']} indexed, {waiting} waiting")
+                except KeyboardInterrupt:
+                    engine.cancel()  # files in flight stop at their next page (conversions checkpoint)
+                    raise
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+        self._report_timing()
+        self.log(f"Stopped watching {self.folder}: {self.counts['converted']} converted, "
+                 f"{self.counts['indexed']} indexed, {self.counts['removed']} removed, {self.counts['failed']} failed.")
+        return dict(self.counts)
+
+# -----------------------------
+# Search worker processes
+# -----------------------------
+_search_pool = {}
+_search_pool_lock = threading.Lock()
+
+def shared_search_pool(workers):
+    """Process-wide pool of `workers` search processes, kept between searches so each
+    worker imports the engine once. Spawned (not forked) on every platform: forking a
+    process that runs Tk and OCR threads is unsafe."""
+    with _search_pool_lock:
+        pool = _search_pool.get("pool")
+        if pool is None or _search_pool.get("workers") != workers:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _search_pool.update(pool=pool, workers=workers)
+        return pool
+
+def drop_search_pool(pool=None):
+    with _search_pool_lock:
+        if _search_pool.get("pool") is not None and pool in (None, _search_pool["pool"]):
+            _search_pool.pop("pool").shutdown(wait=False, cancel_futures=True)
+
+# per worker process: one Engine (and its matchers / index connection) per settings
+_worker = {}
+
+def _worker_engine(settings, keywords=None):
+    key = json.dumps(settings, sort_keys=True)
+    if _worker.get("key") != key:
+        for index in _worker.get("indexes", {}).values():
+            index.close()
+        _worker.clear()
+        _worker.update(key=key, engine=Engine(settings), matchers={}, indexes={})
+    engine = _worker["engine"]
+    engine.profiler.reset()
+    matcher = None
+    if keywords:
+        matcher = _worker["matchers"].get(tuple(keywords))
+        if matcher is None:
+            # the pool already uses every core: rapidfuzz scores on this worker's thread only
+            matcher = _worker["matchers"][tuple(keywords)] = engine.make_matcher(keywords, workers=1)
+    return engine, matcher
+
+def _scan_pdf_chunk(settings, path, first, last, keywords=None):
+    """Worker task: text layer of pages [first, last) of `path`, matched against
+    `keywords` if given. Returns ([(page_no, text, recs)], pnos to OCR, start, dur)."""
+    start = time.perf_counter()
+    engine, matcher = _worker_engine(settings, keywords)
+    pages, need_ocr = [], []
+    with fitz.open(path) as doc:
+        for pno in range(first, min(last, doc.page_count)):
+            text = engine.page_text_layer(doc, pno)
+            if not text:
+                need_ocr.append(pno)
+            elif matcher is not None:
+                pages.append((pno + 1, "", engine._search_text_in_doc(path, pno + 1, text, matcher, "searchable")))
+            else:
+                pages.append((pno + 1, text, None))
+    return pages, need_ocr, start, time.perf_counter() - start
+
+def _match_index_file(settings, index_path, path, keywords):
+    """Worker task: match every indexed page of `path`. Returns (recs, start, dur)."""
+    start = time.perf_counter()
+    engine, matcher = _worker_engine(settings, keywords)
+    index = _worker["indexes"].get(index_path)
+    if index is None:
+        index = _worker["indexes"][index_path] = PageTextIndex(index_path)
+    recs = []
+    for page_no, text, mode in index.iter_pages(path):
+        recs.extend(engine._search_text_in_doc(path, page_no, text, matcher, mode))
+    return recs, start, time.perf_counter() - start